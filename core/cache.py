@@ -0,0 +1,60 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import MemcachedCache
+
+from . import metrics
+
+_missing = object()
+
+
+def _count(key, hit):
+    metrics.inc('yatube_cache_requests_total', kind=metrics.cache_kind(key),
+                result='hit' if hit else 'miss')
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи чтений по виду ключа."""
+    # базовый get_many читает ключи через get: их не надо считать дважды
+    _batch = threading.local()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version=version)
+        hit = value is not _missing
+        if not getattr(self._batch, 'active', False):
+            _count(key, hit)
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        self._batch.active = True
+        try:
+            found = super().get_many(keys, version=version)
+        finally:
+            self._batch.active = False
+        for key in keys:
+            _count(key, key in found)
+        return found
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedMemcachedCache(InstrumentedCacheMixin, MemcachedCache):
+    pass
+
+
+def is_shared(alias='default'):
+    """
+    Видят ли записи этого кэша все процессы сайта: Dummy - никогда, LocMem -
+    только если процесс один (WEB_PROCESSES).
+    """
+    backend = caches[alias]
+    if isinstance(backend, DummyCache):
+        return False
+    if isinstance(backend, LocMemCache):
+        return settings.WEB_PROCESSES <= 1
+    return True
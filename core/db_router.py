@@ -0,0 +1,77 @@
+"""
+Чтение с реплик, запись в основную базу.
+
+Реплики перечислены в settings.DATABASE_REPLICAS. На случайную реплику
+уходят только чтения моделей из REPLICA_MODELS и только внутри view,
+помеченных replica_reads (ленты и профиль). Сессии, пользователи, счётчики,
+команды и фоновые потоки читают основную базу. Помеченный view тоже
+читает основную базу, если поток закреплён за ней: внутри транзакции, во
+время изменяющего запроса и в течение REPLICA_PIN_SECONDS после того, как
+посетитель что-то записал (запись ещё может не дойти до реплик).
+Закрепление ставит core.middleware.ReplicaPinMiddleware.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+@contextmanager
+def use_primary():
+    """Все чтения потока внутри блока идут в основную базу."""
+    depth = getattr(_state, 'depth', 0)
+    _state.depth = depth + 1
+    try:
+        yield
+    finally:
+        _state.depth = depth
+
+
+@contextmanager
+def use_replicas():
+    """Чтения моделей из REPLICA_MODELS внутри блока могут идти на реплики."""
+    depth = getattr(_state, 'replicas', 0)
+    _state.replicas = depth + 1
+    try:
+        yield
+    finally:
+        _state.replicas = depth
+
+
+def replica_reads(view):
+    """Разрешает view читать ленты с реплик."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with use_replicas():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def is_pinned():
+    return (getattr(_state, 'depth', 0) > 0
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not getattr(_state, 'replicas', 0)
+                or model._meta.label_lower not in settings.REPLICA_MODELS
+                or is_pinned()):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,109 @@
+"""
+Метрики процесса в текстовом формате Prometheus.
+
+Реестр живёт в памяти процесса и защищён одной блокировкой: запись метрики
+стоит пару словарных операций, поэтому инструментацию можно не выключать.
+При нескольких worker'ах каждый отдаёт свои числа, а складывает их уже
+Prometheus по метке instance.
+"""
+import re
+import threading
+from bisect import bisect_left
+
+# границы корзин гистограмм в секундах
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+           2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def inc(name, value=1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    key = (name, _labels(labels))
+    index = bisect_left(BUCKETS, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            # счётчики корзин, затем сумма и число наблюдений
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0, 0]
+        histogram[index] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+def _format(name, labels, value, extra=()):
+    pairs = ','.join(f'{key}="{_escape(item)}"'
+                     for key, item in (*labels, *extra))
+    return f'{name}{{{pairs}}} {value}' if pairs else f'{name} {value}'
+
+
+def render():
+    """Все метрики в текстовом формате экспозиции Prometheus 0.0.4."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(value) for key, value in _histograms.items()}
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        if name in _help:
+            lines.append(f'# HELP {name} {_help[name]}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(_format(name, labels, value))
+    for name in sorted({name for name, _ in histograms}):
+        if name in _help:
+            lines.append(f'# HELP {name} {_help[name]}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            total = 0
+            for bound, count in zip((*BUCKETS, '+Inf'), values):
+                total += count
+                lines.append(_format(f'{name}_bucket', labels, total,
+                                     [('le', bound)]))
+            lines.append(_format(f'{name}_sum', labels, values[-2]))
+            lines.append(_format(f'{name}_count', labels, values[-1]))
+    return '\n'.join(lines) + '\n'
+
+
+def cache_kind(key):
+    """Вид ключа кэша без переменной части: 'page', 'feed-count', ..."""
+    match = re.match(r'[A-Za-z_-]+', key)
+    return match.group(0) if match else 'other'
+
+
+describe('yatube_requests_total', 'Обработанные запросы')
+describe('yatube_request_duration_seconds', 'Время ответа view')
+describe('yatube_db_queries_total', 'SQL-запросы')
+describe('yatube_db_duration_seconds', 'Время SQL-запросов за запрос')
+describe('yatube_template_render_seconds', 'Время отрисовки шаблона')
+describe('yatube_cache_requests_total', 'Чтения кэша по виду ключа')
+describe('yatube_page_cache_total', 'Страницы анонимов из кэша и мимо него')
@@ -0,0 +1,75 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import db_router, metrics
+
+
+class QueryTimer:
+    """execute_wrapper, который считает запросы и время в базе."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Время ответа и SQL по имени URL; метрики отдаёт core.views.metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        # имя маршрута, а не путь: у меток должно быть конечное число значений
+        view = match.view_name if match else 'unresolved'
+        metrics.inc('yatube_requests_total', view=view,
+                    method=request.method, status=response.status_code)
+        metrics.observe('yatube_request_duration_seconds', elapsed,
+                        view=view)
+        metrics.inc('yatube_db_queries_total', timer.count, view=view)
+        metrics.observe('yatube_db_duration_seconds', timer.seconds,
+                        view=view)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Изменяющие запросы и запросы посетителя, недавно что-то записавшего,
+    читают из основной базы, чтобы он сразу видел свои посты, комментарии и
+    подписки. Недавнюю запись отмечает короткоживущая cookie: по ней решаем
+    ещё до чтения сессии, которая на реплике тоже может отставать.
+    """
+    COOKIE = 'db_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        if not writes and self.COOKIE not in request.COOKIES:
+            return self.get_response(request)
+        with db_router.use_primary():
+            response = self.get_response(request)
+        if writes:
+            response.set_cookie(self.COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True)
+        return response
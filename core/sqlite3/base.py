@@ -0,0 +1,27 @@
+"""
+SQLite с настройкой соединения под конкурентную запись.
+
+Каждое новое соединение получает прагмы из settings.SQLITE_PRAGMAS (WAL,
+busy_timeout, synchronous и размеры кэша). Транзакции открываются через
+BEGIN IMMEDIATE: отложенная транзакция, которая сначала читает, а потом
+пишет, при занятой базе сразу падает с «database is locked», не дожидаясь
+busy_timeout, а немедленная ждёт блокировку записи заранее. Базе в памяти
+(тесты) это не нужно: там общий кэш с блокировками таблиц, которые
+busy_timeout не ждёт.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if settings.SQLITE_BEGIN_IMMEDIATE and not self.is_in_memory_db():
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
+
+
+def metrics_view(request):
+    """
+    Метрики для Prometheus. Отдаются только с заголовком
+    Authorization: Bearer <METRICS_TOKEN>: за прокси REMOTE_ADDR у всех
+    запросов один и тот же, поэтому по адресу не проверяем. Без токена в
+    настройках адрес просто не существует.
+    """
+    token = settings.METRICS_TOKEN
+    given = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not constant_time_compare(given, f'Bearer {token}'):
+        raise Http404
+    return HttpResponse(metrics.render(),
+                        content_type='text/plain; version=0.0.4')
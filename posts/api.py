@@ -0,0 +1,213 @@
+"""
+JSON API только для чтения: те же ленты, пост и профиль, что и в HTML.
+
+Записи выбираются через values() ровно с теми полями, что попросил клиент
+(?fields=id,text), и превращаются в словари без создания моделей. Ленты
+листаются курсором (?after= / ?before=), как и HTML-страницы. Ответ несёт
+ETag от содержимого, и повторный запрос с If-None-Match получает 304.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import parse_etags, urlencode
+
+from . import counters, thumbnails
+from .models import Comment, Group, Post, TimelineEntry, User
+from .paginator import CursorPaginator, keyset_chunk
+from .storage import post_images
+
+# поле ответа -> путь для values() от поста
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'thumbnail': 'thumbnails',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+def _image_url(row, prefix):
+    name = row[f'{prefix}image']
+    return post_images.url(name) if name else None
+
+
+def _thumbnail_url(row, prefix):
+    return thumbnails.stored_url(row[f'{prefix}thumbnails'],
+                                 row[f'{prefix}image'], 'card')
+
+
+# поля, которые считаются из нескольких колонок строки
+POST_EXTRA_PATHS = {'thumbnail': ['thumbnails', 'image']}
+POST_CONVERTERS = {'image': _image_url, 'thumbnail': _thumbnail_url}
+
+
+def selected_fields(request, available):
+    """Поля из ?fields=, неизвестные пропускаются; без параметра — все."""
+    requested = [name.strip() for name in
+                 request.GET.get('fields', '').split(',') if name.strip()]
+    fields = [name for name in requested if name in available]
+    return fields or list(available)
+
+
+def post_rows(fields, prefix=''):
+    """Пары (значения для values(), функция строка -> словарь ответа)."""
+    paths = set()
+    for name in fields:
+        for path in POST_EXTRA_PATHS.get(name, [POST_FIELDS[name]]):
+            paths.add(prefix + path)
+
+    def shape(row):
+        return {name: (POST_CONVERTERS[name](row, prefix)
+                       if name in POST_CONVERTERS
+                       else row[prefix + POST_FIELDS[name]])
+                for name in fields}
+    return paths, shape
+
+
+def json_response(request, data):
+    """JsonResponse с ETag по содержимому и ответом 304 на совпадение."""
+    response = JsonResponse(data, encoder=DjangoJSONEncoder,
+                            json_dumps_params={'ensure_ascii': False})
+    etag = '"%s"' % hashlib.md5(response.content).hexdigest()
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    response['ETag'] = etag
+    response['Vary'] = 'Cookie'
+    return response
+
+
+def api_view(view):
+    """Разрешает только GET и HEAD и отдаёт словарь из view как JSON."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = json_error('Метод не поддерживается', 405)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        data = view(request, *args, **kwargs)
+        if isinstance(data, HttpResponse):
+            return data
+        return json_response(request, data)
+    return wrapper
+
+
+def json_error(message, status):
+    return JsonResponse({'detail': message}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def cursor_page(request, queryset, fields, prefix=''):
+    """Страница ленты: записи и ссылки на соседние страницы."""
+    paths, shape = post_rows(fields, prefix)
+    keys = ('pub_date', 'id')
+    rows = queryset.values(*paths | set(keys))
+    paginator = CursorPaginator(rows, settings.COUNT_POSTS_IN_PAGE,
+                                keys=keys,
+                                after=request.GET.get('after'),
+                                before=request.GET.get('before'))
+    page = paginator.page()
+
+    def link(**params):
+        query = {key: value for key, value in request.GET.items()
+                 if key not in ('after', 'before')}
+        query.update(params)
+        return f'{request.path}?{urlencode(query)}'
+
+    return {
+        'results': [shape(row) for row in page.object_list],
+        'next': (link(after=paginator.next_cursor)
+                 if paginator.next_cursor else None),
+        'previous': (link(before=paginator.previous_cursor)
+                     if paginator.previous_cursor else None),
+    }
+
+
+@api_view
+def index(request):
+    fields = selected_fields(request, POST_FIELDS)
+    return cursor_page(request, Post.objects.all(), fields)
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    fields = selected_fields(request, POST_FIELDS)
+    return cursor_page(request, Post.objects.filter(group=group), fields)
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    stats = counters.for_user(author)
+    return {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+        'posts': reverse('api:profile_posts', args=[author.username]),
+    }
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    fields = selected_fields(request, POST_FIELDS)
+    return cursor_page(request, Post.objects.filter(author=author), fields)
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_error('Нужно войти', 401)
+    fields = selected_fields(request, POST_FIELDS)
+    entries = TimelineEntry.objects.filter(user=request.user)
+    return cursor_page(request, entries, fields, prefix='post__')
+
+
+def comment_chunk(post_id, after=None):
+    """Порция комментариев поста словарями и ссылка на следующую порцию."""
+    comments = Comment.objects.filter(post_id=post_id).values(
+        *COMMENT_FIELDS.values())
+    chunk, cursor = keyset_chunk(comments, settings.COMMENTS_PER_PAGE,
+                                 keys=('created', 'id'), after=after)
+    results = [{name: comment[path]
+                for name, path in COMMENT_FIELDS.items()}
+               for comment in chunk]
+    next_url = None
+    if cursor:
+        url = reverse('api:post_comments', args=[post_id])
+        next_url = f'{url}?{urlencode({"after": cursor})}'
+    return results, next_url
+
+
+@api_view
+def post_view(request, post_id):
+    fields = selected_fields(request, POST_FIELDS)
+    paths, shape = post_rows(fields)
+    row = get_object_or_404(Post.objects.values(*paths, 'author__username'),
+                            id=post_id)
+    data = shape(row)
+    data['comments'], data['comments_next'] = comment_chunk(post_id)
+    return data
+
+
+@api_view
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    results, next_url = comment_chunk(post_id, request.GET.get('after'))
+    return {'results': results, 'next': next_url}
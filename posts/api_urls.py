@@ -0,0 +1,17 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.index, name='index'),
+    path('posts/<int:post_id>/', api.post_view, name='post_view'),
+    path('posts/<int:post_id>/comments/', api.post_comments,
+         name='post_comments'),
+    path('groups/<slug:slug>/posts/', api.group_posts, name='group'),
+    path('follow/', api.follow_index, name='follow_index'),
+    path('users/<str:username>/', api.profile, name='profile'),
+    path('users/<str:username>/posts/', api.profile_posts,
+         name='profile_posts'),
+]
@@ -0,0 +1,63 @@
+"""
+Кэш отрендеренных карточек постов.
+
+Карточка одинакова на главной, в группе, профиле и подписках, поэтому её
+HTML кэшируется под ключом с версией поста: всё, что выводится в карточке,
+входит в версию, и изменённый пост просто получает новый ключ. Ссылка
+«Редактировать» зависит от зрителя: в кэше на её месте стоит метка, которую
+подменяют при сборке страницы.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+TEMPLATE = 'includes/post_card_body.html'
+EDIT_MARK = '<!--post-edit-->'
+
+
+def version(post):
+    # счётчик комментариев и превью пишутся через update() и не трогают
+    # updated, поэтому входят в версию отдельно
+    author = post.author
+    group = post.group
+    parts = [post.updated.isoformat() if post.updated else '',
+             post.comments_count, post.thumbnails, post.image.name or '',
+             author.username, author.get_full_name(),
+             group.slug if group else '', group.title if group else '']
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def key(post):
+    return f'post-card:{post.id}:{version(post)}'
+
+
+def _edit_link(post, user):
+    if not user or user.pk != post.author_id:
+        return ''
+    return format_html(
+        '<a class="btn btn-sm text-muted" href="{}" '
+        'role="button">Редактировать</a>',
+        reverse('posts:post_edit', args=[post.author.username, post.id]))
+
+
+def render(posts, user=None):
+    """HTML карточек: кэшированные берутся одним get_many."""
+    posts = list(posts)
+    keys = {post.id: key(post) for post in posts}
+    cached = cache.get_many(list(keys.values()))
+    missing = {}
+    for post in posts:
+        if keys[post.id] not in cached:
+            missing[keys[post.id]] = render_to_string(TEMPLATE,
+                                                      {'post': post})
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        cached.update(missing)
+    return mark_safe(''.join(
+        cached[keys[post.id]].replace(EDIT_MARK, _edit_link(post, user))
+        for post in posts))
@@ -0,0 +1,16 @@
+from django.core.checks import Error, register
+
+from core.cache import is_shared
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    if is_shared():
+        return []
+    return [Error(
+        'Кэш по умолчанию не общий для процессов сайта.',
+        hint=('Граф подписок будет читаться из базы, а опрос новых постов '
+              'отвечать без ожидания. При YATUBE_WEB_PROCESSES больше '
+              'единицы задайте YATUBE_MEMCACHED.'),
+        id='posts.E001',
+    )]
@@ -0,0 +1,65 @@
+"""
+Денормализованные счётчики: записи, подписчики и подписки пользователя
+(UserStats) и комментарии поста (Post.comments_count).
+
+Счётчики меняются атомарными UPDATE ... SET x = x + 1 из сигналов в той же
+транзакции, что и сама запись. Строка UserStats создаётся лениво пересчётом
+при первом чтении, расхождения исправляет команда reconcile_counters.
+"""
+from django.db.models import Count, F
+
+from .models import Follow, Post, UserStats
+
+FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def bump(user_id, **deltas):
+    """Атомарно изменяет счётчики пользователя, если строка уже есть."""
+    if user_id is None:
+        return
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def count_for(user_ids):
+    """Считает счётчики по исходным таблицам: {user_id: {поле: значение}}."""
+    totals = {user_id: dict.fromkeys(FIELDS, 0) for user_id in user_ids}
+    queries = (
+        ('posts_count', Post.objects.filter(author_id__in=user_ids),
+         'author_id'),
+        ('followers_count', Follow.objects.filter(author_id__in=user_ids),
+         'author_id'),
+        ('following_count', Follow.objects.filter(user_id__in=user_ids),
+         'user_id'),
+    )
+    for field, queryset, key in queries:
+        for user_id, total in queryset.values_list(key).annotate(
+                total=Count('id')).order_by():
+            totals[user_id][field] = total
+    return totals
+
+
+def recount(user_id):
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=count_for([user_id])[user_id])
+    return stats
+
+
+def for_user(user):
+    """Счётчики пользователя одним чтением по первичному ключу."""
+    try:
+        return UserStats.objects.get(user_id=user.pk)
+    except UserStats.DoesNotExist:
+        return recount(user.pk)
+
+
+def comments_count_drift():
+    """Посты, у которых сохранённое число комментариев не совпадает."""
+    return Post.objects.annotate(
+        real_count=Count('comments_post')).exclude(
+        comments_count=F('real_count'))
@@ -0,0 +1,202 @@
+"""
+Генератор большого синтетического набора данных.
+
+Распределения похожи на живой сайт: у авторов степенной закон популярности
+и небольшая группа знаменитостей, посты неравномерно распределены по
+группам, комментарии тянутся к свежим постам, часть постов с картинками.
+Тексты собираются из пула фраз, который один раз готовит faker из mixer,
+строки пишутся через bulk_create пачками, а id задаются явно, чтобы не
+держать в памяти списки миллионов ключей. При одном и том же seed
+получается один и тот же набор.
+"""
+import datetime as dt
+import random
+from io import BytesIO, StringIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from mixer.backend.django import mixer
+from PIL import Image
+
+from . import follow_graph, search, timeline, trending
+from .models import Comment, Follow, Group, Post, User
+from .ndjson import Progress, keep_dates
+from .storage import post_images
+
+PHRASES = 5000
+IMAGES = 20
+
+
+def cumulative_zipf(count, alpha, boosted=0, boost=1.0):
+    """Накопленные веса рангов 1..count; первые boosted умножены на boost."""
+    return list(accumulate(
+        (boost if rank <= boosted else 1.0) / rank ** alpha
+        for rank in range(1, count + 1)))
+
+
+def next_pk(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class DatasetGenerator:
+    def __init__(self, users=10000, posts=1000000, comments=3000000,
+                 groups=50, follows_per_user=30, celebrities=20,
+                 image_share=0.1, days=365, seed=0, batch_size=5000,
+                 on_progress=None):
+        self.users = users
+        self.posts = posts
+        self.comments = comments
+        self.groups = groups
+        self.follows_per_user = follows_per_user
+        self.celebrities = celebrities
+        self.image_share = image_share
+        self.days = days
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.progress = Progress()
+        self.rnd = random.Random(seed)
+        self.faker = mixer.faker
+        self.faker.locale = 'ru'
+        self.faker.seed_instance(seed)
+        self.phrases = [self.faker.sentence() for _ in range(PHRASES)]
+
+    def generate(self):
+        with keep_dates(Post._meta.get_field('pub_date'),
+                        Comment._meta.get_field('created')):
+            self.make_users()
+            self.make_groups()
+            self.make_follows()
+            self.make_images()
+            self.make_posts()
+            self.make_comments()
+        return self.progress
+
+    def save(self, model, rows, **kwargs):
+        with transaction.atomic():
+            model.objects.bulk_create(rows, **kwargs)
+        self.progress.rows += len(rows)
+        if self.on_progress:
+            self.on_progress(self.progress)
+
+    def batches(self, total, build):
+        """Строит и сохраняет строки пачками по batch_size."""
+        for start in range(0, total, self.batch_size):
+            stop = min(total, start + self.batch_size)
+            yield [build(i) for i in range(start, stop)]
+
+    def text(self, low, high):
+        return ' '.join(self.rnd.choices(self.phrases,
+                                         k=self.rnd.randint(low, high)))
+
+    def make_users(self):
+        first = next_pk(User)
+        password = make_password(None)
+        joined = timezone.now() - dt.timedelta(days=self.days)
+
+        def build(i):
+            return User(pk=first + i,
+                        username=f'{self.faker.user_name()}{first + i}',
+                        first_name=self.faker.first_name(),
+                        last_name=self.faker.last_name(),
+                        password=password, date_joined=joined)
+        for rows in self.batches(self.users, build):
+            self.save(User, rows)
+        # ранг популярности не связан с id
+        self.user_ids = list(range(first, first + self.users))
+        self.ranked = self.user_ids[:]
+        self.rnd.shuffle(self.ranked)
+        self.author_weights = cumulative_zipf(
+            self.users, 1.0, self.celebrities, 10.0)
+
+    def make_groups(self):
+        first = next_pk(Group)
+        self.save(Group, [Group(
+            pk=first + i,
+            title=self.faker.sentence(nb_words=3)[:200],
+            slug=f'group-{first + i}',
+            description=self.text(1, 3),
+        ) for i in range(self.groups)])
+        self.group_ids = list(range(first, first + self.groups))
+        # группы неравны: первые собирают большую часть постов
+        self.group_weights = cumulative_zipf(self.groups, 1.2)
+
+    def make_follows(self):
+        rows = []
+        for user_id in self.user_ids:
+            # Парето с a=1.5 в среднем даёт 3, отсюда деление
+            count = min(self.users - 1, int(
+                self.rnd.paretovariate(1.5) * self.follows_per_user / 3))
+            authors = set(self.rnd.choices(
+                self.ranked, cum_weights=self.author_weights, k=count))
+            authors.discard(user_id)
+            rows += [Follow(user_id=user_id, author_id=author_id)
+                     for author_id in authors]
+            if len(rows) >= self.batch_size:
+                self.save(Follow, rows, ignore_conflicts=True)
+                rows = []
+        if rows:
+            self.save(Follow, rows, ignore_conflicts=True)
+
+    def make_images(self):
+        self.images = []
+        for i in range(IMAGES):
+            color = tuple(self.rnd.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (960, 540), color).save(buffer, 'JPEG')
+            self.images.append(post_images.save(
+                f'posts/dataset{i}.jpg', ContentFile(buffer.getvalue())))
+
+    def make_posts(self):
+        first = self.first_post = next_pk(Post)
+        start = self.start = timezone.now() - dt.timedelta(days=self.days)
+        step = self.step = dt.timedelta(days=self.days) / max(self.posts, 1)
+
+        def build(i):
+            group_id = None
+            if self.rnd.random() < 0.7:
+                group_id = self.rnd.choices(
+                    self.group_ids, cum_weights=self.group_weights)[0]
+            image = ''
+            if self.rnd.random() < self.image_share:
+                image = self.rnd.choice(self.images)
+            # id растут вместе с датой, как у настоящих постов
+            return Post(pk=first + i, text=self.text(1, 12),
+                        pub_date=start + step * i,
+                        author_id=self.rnd.choices(
+                            self.ranked, cum_weights=self.author_weights)[0],
+                        group_id=group_id, image=image)
+        for rows in self.batches(self.posts, build):
+            self.save(Post, rows)
+
+    def make_comments(self):
+        if not self.posts:
+            return
+        now = timezone.now()
+
+        def build(i):
+            # чем свежее пост, тем больше у него комментариев
+            index = self.posts - 1 - int(self.posts * self.rnd.random() ** 3)
+            published = self.start + self.step * index
+            return Comment(post_id=self.first_post + index,
+                           author_id=self.rnd.choice(self.user_ids),
+                           text=self.text(1, 2),
+                           created=published + (now - published)
+                           * self.rnd.random())
+        for rows in self.batches(self.comments, build):
+            self.save(Comment, rows)
+
+
+def rebuild_derived():
+    """Ленты, поиск и счётчики, которые bulk_create не создаёт сам."""
+    timeline.rebuild()
+    search.rebuild()
+    call_command('reconcile_counters', stdout=StringIO())
+    cache.clear()
+    follow_graph.reset()
+    trending.rebuild()
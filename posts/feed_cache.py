@@ -0,0 +1,43 @@
+"""
+Версионирование кэша лент.
+
+Фрагменты лент кэшируются надолго под ключом, в который входит номер
+поколения. Любая запись поста, комментария или подписки увеличивает номер,
+и все старые фрагменты просто перестают читаться.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'feed:generation'
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # после вытеснения начинаем с нового значения, а не с единицы,
+        # чтобы не прочитать фрагменты прошлых поколений
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+def bump():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation()
+
+
+def context(feed):
+    """
+    Переменные для {% cache %} в шаблонах лент. Кроме типа ленты и
+    поколения ключ фрагмента зависит от пользователя (в карточках есть
+    ссылка «Редактировать» для автора) и от параметров страницы.
+    """
+    return {
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'feed_type': feed,
+        'feed_generation': generation(),
+    }
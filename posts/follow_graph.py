@@ -0,0 +1,257 @@
+"""
+Граф подписок в памяти процесса.
+
+Для каждого пользователя хранятся отсортированные массивы id подписчиков и
+авторов, на которых он подписан (array, 8 байт на ребро в каждую сторону),
+поэтому проверка подписки - бинарный поиск, а счётчики - длина массива.
+Граф загружается из Follow при первом обращении (или при старте через
+warm_up) и дальше меняется по журналу операций в кэше: процесс, записавший
+подписку, добавляет операцию после коммита, остальные раз в
+FOLLOW_GRAPH_SYNC_INTERVAL проигрывают новые операции. Если журнала не
+хватает (вытеснен, кэш очищен), граф загружается заново.
+
+Граф узнаёт о подписке только после коммита, поэтому транзакция, которая
+сама уже подписала или отписала кого-то (changed()), получает ответы из
+базы; остальные транзакции, например публикация поста, читают снимок,
+загруженный вне транзакций. Из
+базы же ответы берутся, когда кэш не общий для процессов сайта: журнал
+другим процессам тогда не виден.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, transaction
+
+from core.cache import is_shared
+
+from .models import Follow
+
+logger = logging.getLogger(__name__)
+
+SEQ_KEY = 'follow-graph:seq'
+# при большем отставании проще загрузить граф заново
+MAX_REPLAY = 1000
+
+
+def _op_key(number):
+    return f'follow-graph:op:{number}'
+
+
+class FollowGraph:
+    def __init__(self):
+        self.followers = {}
+        self.following = {}
+
+    @classmethod
+    def load(cls):
+        graph = cls()
+        # граф сверяется с журналом, поэтому реплика с отставанием не годится
+        rows = Follow.objects.using(DEFAULT_DB_ALIAS).order_by(
+            'user_id', 'author_id').values_list('user_id',
+                                                'author_id').iterator()
+        for user_id, author_id in rows:
+            # авторы пользователя приходят уже по возрастанию
+            graph.following.setdefault(user_id, array('q')).append(author_id)
+            graph.followers.setdefault(author_id, array('q')).append(user_id)
+        for ids in graph.followers.values():
+            ids[:] = array('q', sorted(ids))
+        return graph
+
+    @staticmethod
+    def _insert(index, key, value):
+        ids = index.setdefault(key, array('q'))
+        position = bisect_left(ids, value)
+        if position == len(ids) or ids[position] != value:
+            ids.insert(position, value)
+
+    @staticmethod
+    def _remove(index, key, value):
+        ids = index.get(key)
+        if not ids:
+            return
+        position = bisect_left(ids, value)
+        if position < len(ids) and ids[position] == value:
+            del ids[position]
+        if not ids:
+            del index[key]
+
+    def add(self, user_id, author_id):
+        self._insert(self.following, user_id, author_id)
+        self._insert(self.followers, author_id, user_id)
+
+    def remove(self, user_id, author_id):
+        self._remove(self.following, user_id, author_id)
+        self._remove(self.followers, author_id, user_id)
+
+    def is_following(self, user_id, author_id):
+        ids = self.following.get(user_id, ())
+        position = bisect_left(ids, author_id)
+        return position < len(ids) and ids[position] == author_id
+
+    def edges(self):
+        return sum(len(ids) for ids in self.following.values())
+
+
+class _State:
+    """Общее для потоков процесса состояние графа."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.graph = None
+        self.seq = None
+        self.checked = 0.0
+
+
+_state = _State()
+
+
+def _head():
+    head = cache.get(SEQ_KEY)
+    if head is None:
+        # новое начало журнала, а не ноль: старые операции не подойдут
+        cache.add(SEQ_KEY, int(time.time() * 1000), None)
+        head = cache.get(SEQ_KEY)
+    return head
+
+
+def _sync(load=True):
+    head = _head()
+    graph, seq = _state.graph, _state.seq
+    if graph is not None and seq is not None and seq <= head:
+        if head - seq > MAX_REPLAY:
+            graph = None
+        elif head > seq:
+            numbers = range(seq + 1, head + 1)
+            ops = cache.get_many([_op_key(number) for number in numbers])
+            if len(ops) == len(numbers):
+                for number in numbers:
+                    op, user_id, author_id = ops[_op_key(number)]
+                    getattr(graph, op)(user_id, author_id)
+            else:
+                graph = None
+    else:
+        graph = None
+    if graph is None:
+        if not load:
+            # снимка нет или он отстал: до загрузки отвечает база
+            _state.graph = _state.seq = None
+            return
+        # журнал с head учтён в базе; более поздние операции повторятся
+        # при следующей сверке, add и remove к этому готовы
+        graph = FollowGraph.load()
+    _state.graph, _state.seq = graph, head
+    _state.checked = time.monotonic()
+
+
+def _changed_in_transaction():
+    # изменения подписок текущей транзакции ждут коммита в run_on_commit;
+    # откат точки сохранения убирает их оттуда вместе с изменениями
+    return any(func is reset or getattr(func, 'func', None) is record
+               for _, func in connection.run_on_commit)
+
+
+def _graph():
+    if not is_shared():
+        return None
+    # в транзакции граф только догоняет журнал, но не загружается: снимок
+    # должен состоять из закоммиченных подписок
+    in_transaction = connection.in_atomic_block
+    if in_transaction and _changed_in_transaction():
+        return None
+    if (_state.graph is None or time.monotonic() - _state.checked
+            >= settings.FOLLOW_GRAPH_SYNC_INTERVAL):
+        with _state.lock:
+            _sync(load=not in_transaction)
+    return _state.graph
+
+
+def warm_up():
+    """Загружает граф заранее, чтобы первый запрос не ждал."""
+    if not is_shared():
+        return
+    try:
+        with _state.lock:
+            _sync()
+    except DatabaseError:
+        logger.warning('Граф подписок не загружен', exc_info=True)
+
+
+def reset():
+    """Заставляет все процессы загрузить граф заново."""
+    cache.delete(SEQ_KEY)
+    with _state.lock:
+        _state.graph = _state.seq = None
+
+
+def record(op, user_id, author_id):
+    """
+    Применяет закоммиченную подписку ('add') или отписку ('remove') к
+    графу процесса и пишет её в журнал для остальных.
+    """
+    if not is_shared():
+        return
+    try:
+        number = cache.incr(SEQ_KEY)
+    except ValueError:
+        # журнал пропал: все, и этот процесс тоже, загрузят граф заново
+        reset()
+        return
+    cache.set(_op_key(number), (op, user_id, author_id),
+              settings.FOLLOW_GRAPH_LOG_TIMEOUT)
+    with _state.lock:
+        if _state.graph is not None:
+            getattr(_state.graph, op)(user_id, author_id)
+
+
+def changed(op, user_id, author_id):
+    """
+    Отмечает подписку ('add') или отписку ('remove') текущей транзакции:
+    после коммита она попадёт в граф и журнал.
+    """
+    transaction.on_commit(partial(record, op, user_id, author_id))
+
+
+def is_following(user_id, author_id):
+    graph = _graph()
+    if graph is None:
+        return Follow.objects.filter(user_id=user_id,
+                                     author_id=author_id).exists()
+    return graph.is_following(user_id, author_id)
+
+
+def followers(author_id):
+    """id подписчиков автора по возрастанию."""
+    graph = _graph()
+    if graph is None:
+        return list(Follow.objects.filter(author_id=author_id).order_by(
+            'user_id').values_list('user_id', flat=True))
+    return list(graph.followers.get(author_id, ()))
+
+
+def following(user_id):
+    """id авторов, на которых подписан пользователь, по возрастанию."""
+    graph = _graph()
+    if graph is None:
+        return list(Follow.objects.filter(user_id=user_id).order_by(
+            'author_id').values_list('author_id', flat=True))
+    return list(graph.following.get(user_id, ()))
+
+
+def followers_count(author_id):
+    graph = _graph()
+    if graph is None:
+        return Follow.objects.filter(author_id=author_id).count()
+    return len(graph.followers.get(author_id, ()))
+
+
+def following_count(user_id):
+    graph = _graph()
+    if graph is None:
+        return Follow.objects.filter(user_id=user_id).count()
+    return len(graph.following.get(user_id, ()))
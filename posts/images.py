@@ -0,0 +1,142 @@
+"""
+Обработка загруженных картинок вне запроса.
+
+Загрузка сохраняется как есть, а после коммита картинка уходит в пул
+процессов: там она поворачивается по EXIF, теряет метаданные, уменьшается
+до IMAGE_MAX_SIZE и перекодируется. Когда результат готов, пост получает
+новый файл, превью и свежие страницы. Модели Django здесь импортируются
+только внутри функций: дочерние процессы запускают лишь process().
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from functools import partial
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def process(path, max_size, image_format, quality):
+    """Возвращает байты обработанной картинки."""
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail(max_size, Image.LANCZOS)
+    if image_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB' if image_format == 'JPEG' else 'RGBA')
+    buffer = BytesIO()
+    # exif и icc не передаются, поэтому в файл они не попадут
+    image.save(buffer, image_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _get_pool():
+    global _pool
+    from django.conf import settings
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context('spawn')
+            _pool = context.Pool(settings.IMAGE_PIPELINE_WORKERS)
+            atexit.register(_shutdown)
+        return _pool
+
+
+def _shutdown():
+    # дожидаемся начатых картинок, иначе пул закроется при сборке мусора
+    _pool.close()
+    _pool.join()
+
+
+def _refresh(post):
+    from . import feed_cache, signals, thumbnails
+    thumbnails.generate(post)
+    feed_cache.bump()
+    signals.invalidate_post_pages(post)
+
+
+def _finish(post_id, name, data):
+    """Подменяет исходную картинку поста обработанной."""
+    from django.conf import settings
+    from django.core.files.base import ContentFile
+    from django.db import transaction
+
+    from . import storage
+    from .models import Post
+    field = Post._meta.get_field('image')
+    stem = os.path.splitext(os.path.basename(name))[0]
+    extension = EXTENSIONS.get(settings.IMAGE_FORMAT,
+                               settings.IMAGE_FORMAT.lower())
+    new_name = field.storage.save(f'{field.upload_to}{stem}.{extension}',
+                                  ContentFile(data))
+    with transaction.atomic():
+        if not Post.objects.filter(pk=post_id, image=name).update(
+                image=new_name):
+            # пост удалили или картинку успели сменить
+            storage.discard(new_name)
+            return
+        storage.acquire(new_name)
+        storage.release(name)
+    _refresh(Post.objects.feed().get(pk=post_id))
+
+
+def _fail(post_id, name, error):
+    """Оставляет исходную картинку, но готовит для неё превью."""
+    from .models import Post
+    logger.error('Не удалось обработать %s у поста %s: %r',
+                 name, post_id, error)
+    post = Post.objects.feed().filter(pk=post_id, image=name).first()
+    if post is not None:
+        _refresh(post)
+
+
+def _in_pool_thread(handler, *args):
+    # обработчики пула выполняются в его служебном потоке: исключение
+    # остановило бы поток, а соединение с базой осталось бы открытым;
+    # читать пост здесь нужно из основной базы, реплика может отставать
+    from django.db import connection
+
+    from core.db_router import use_primary
+    try:
+        with use_primary():
+            handler(*args)
+    except Exception:
+        logger.exception('Ошибка при замене картинки поста %s', args[0])
+    finally:
+        connection.close()
+
+
+def submit(post_id, name):
+    """Отправляет картинку поста на обработку."""
+    from django.conf import settings
+    from .models import Post
+    storage = Post._meta.get_field('image').storage
+    args = (storage.path(name), settings.IMAGE_MAX_SIZE,
+            settings.IMAGE_FORMAT, settings.IMAGE_QUALITY)
+    if not settings.IMAGE_PIPELINE_WORKERS:
+        try:
+            data = process(*args)
+        except Exception as error:
+            _fail(post_id, name, error)
+        else:
+            _finish(post_id, name, data)
+        return
+    _get_pool().apply_async(
+        process, args,
+        callback=partial(_in_pool_thread, _finish, post_id, name),
+        error_callback=partial(_in_pool_thread, _fail, post_id, name),
+    )
+
+
+def schedule(post):
+    """Запускает обработку после коммита транзакции с постом."""
+    from django.db import transaction
+    name = post.image.name
+    transaction.on_commit(lambda: submit(post.pk, name))
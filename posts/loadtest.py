@@ -0,0 +1,352 @@
+"""
+Нагрузочный прогон сайта через настоящий WSGIHandler.
+
+Данные создаёт posts.dataset во временной базе, после чего пул потоков
+гоняет смесь сценариев (анонимные ленты, ленты и действия вошедших
+пользователей) через полный стек middleware и URLconf. Для каждого
+сценария собираются задержки, число SQL-запросов и время в базе; итог
+пишется в JSON, который можно сравнить с прогоном на другом коммите.
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.middleware import QueryTimer
+
+from . import dataset
+from .models import Group, Post, User
+
+# адрес не из INTERNAL_IPS, чтобы debug toolbar не искажал замеры
+REMOTE_ADDR = '203.0.113.10'
+
+
+def percentile(values, share):
+    """Процентиль по ближайшему рангу; values уже отсортированы."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(share * len(values))) - 1))
+    return values[index]
+
+
+class VirtualUser:
+    """Куки одного посетителя; вошедший получает сессию и CSRF-токен."""
+
+    def __init__(self, user=None):
+        self.user = user
+        self.cookies = {}
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            self.cookies['sessionid'] = client.cookies['sessionid'].value
+
+    def environ(self, method, path, data=None):
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'testserver',
+            'REMOTE_ADDR': REMOTE_ADDR,
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if self.cookies:
+            environ['HTTP_COOKIE'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items())
+        return environ
+
+    def request(self, handler, method, path, data=None):
+        if method == 'POST':
+            if 'csrftoken' not in self.cookies:
+                self.request(handler, 'GET', '/new/')
+            data = {**data, 'csrfmiddlewaretoken': self.cookies['csrftoken']}
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result['status'] = int(status.split()[0])
+            for name, value in headers:
+                if name.lower() == 'set-cookie':
+                    for morsel in SimpleCookie(value).values():
+                        self.cookies[morsel.key] = morsel.value
+
+        response = handler(self.environ(method, path, data), start_response)
+        try:
+            b''.join(response)
+        finally:
+            # close() шлёт request_finished и закрывает соединение с базой
+            response.close()
+        return result['status']
+
+
+class Scenarios:
+    """Смесь запросов; вес сценария - доля в общем потоке."""
+
+    WRITES = ('add_comment', 'new_post')
+
+    def __init__(self, seed_value=0):
+        self.rnd = random.Random(seed_value)
+        self.lock = threading.Lock()
+        self.users = list(User.objects.all()[:50])
+        self.groups = list(Group.objects.values_list('slug', flat=True))
+        self.posts = list(Post.objects.select_related('author').order_by(
+            '-pub_date')[:200].values_list('author__username', 'id'))
+        self.mix = [
+            ('index', 20, self.anonymous, self.index),
+            ('group', 10, self.anonymous, self.group),
+            ('profile', 10, self.anonymous, self.profile),
+            ('post_view', 15, self.anonymous, self.post_view),
+            ('index_auth', 10, self.member, self.index),
+            ('follow_index', 15, self.member, self.follow_index),
+            ('post_view_auth', 10, self.member, self.post_view),
+            ('add_comment', 6, self.member, self.add_comment),
+            ('new_post', 4, self.member, self.new_post),
+        ]
+
+    def pick(self, names=None):
+        """Случайный сценарий; names ограничивает выбор."""
+        mix = [item for item in self.mix if not names or item[0] in names]
+        with self.lock:
+            name, _, visitor, build = self.rnd.choices(
+                mix, weights=[item[1] for item in mix])[0]
+            return name, visitor(), build()
+
+    def anonymous(self):
+        return None
+
+    def member(self):
+        return self.rnd.choice(self.users)
+
+    def index(self):
+        return 'GET', '/', None
+
+    def group(self):
+        return 'GET', f'/group/{self.rnd.choice(self.groups)}/', None
+
+    def profile(self):
+        return 'GET', f'/{self.rnd.choice(self.users).username}/', None
+
+    def post_view(self):
+        username, post_id = self.rnd.choice(self.posts)
+        return 'GET', f'/{username}/{post_id}/', None
+
+    def follow_index(self):
+        return 'GET', '/follow/', None
+
+    def add_comment(self):
+        username, post_id = self.rnd.choice(self.posts)
+        return ('POST', f'/{username}/{post_id}/comment/',
+                {'text': 'Нагрузочный комментарий'})
+
+    def new_post(self):
+        return 'POST', '/new/', {'text': 'Нагрузочный пост'}
+
+
+class Recorder:
+    """Копит замеры по сценариям из разных потоков."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, name, sample):
+        with self.lock:
+            self.samples[name].append(sample)
+
+    def summary(self, elapsed):
+        views = {}
+        for name, samples in sorted(self.samples.items()):
+            latencies = sorted(sample['ms'] for sample in samples)
+            views[name] = {
+                'requests': len(samples),
+                'errors': sum(sample['status'] >= 400 for sample in samples),
+                'p50_ms': percentile(latencies, 0.50),
+                'p95_ms': percentile(latencies, 0.95),
+                'p99_ms': percentile(latencies, 0.99),
+                'queries': sum(s['queries'] for s in samples) / len(samples),
+                'db_ms': sum(s['db_ms'] for s in samples) / len(samples),
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        latencies = sorted(sample['ms'] for samples in self.samples.values()
+                           for sample in samples)
+        return {
+            'requests': total,
+            'seconds': elapsed,
+            'throughput_rps': total / elapsed if elapsed else None,
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'views': views,
+        }
+
+
+@contextmanager
+def seeded_database(scale=1.0, seed_value=0, workdir=None):
+    """
+    Временная файловая база с данными posts.dataset: потоки работают с ней
+    через свои соединения. Внутри блока DEBUG выключен.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='loadtest-')
+    settings.DATABASES['default'].setdefault('TEST', {})
+    settings.DATABASES['default']['TEST']['NAME'] = os.path.join(
+        workdir, 'loadtest.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'],
+                               MEDIA_ROOT=workdir):
+            dataset.DatasetGenerator(
+                users=int(200 * scale),
+                posts=int(5000 * scale),
+                comments=int(10000 * scale),
+                groups=20,
+                seed=seed_value,
+            ).generate()
+            dataset.rebuild_derived()
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+class Visitors:
+    """Один VirtualUser на пользователя, общий для потоков."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.visitors = {}
+
+    def get(self, user):
+        key = user.pk if user else None
+        with self.lock:
+            if key not in self.visitors:
+                self.visitors[key] = VirtualUser(user)
+            return self.visitors[key]
+
+
+def _measure(handler, visitor, method, path, data):
+    timer = QueryTimer()
+    started = time.perf_counter()
+    with connection.execute_wrapper(timer):
+        status = visitor.request(handler, method, path, data)
+    return {'ms': (time.perf_counter() - started) * 1000, 'status': status,
+            'queries': timer.count, 'db_ms': timer.seconds * 1000}
+
+
+def run(requests=1000, threads=8, warmup=50, seed_value=0):
+    """Прогоняет requests запросов в threads потоков и возвращает итог."""
+    handler = WSGIHandler()
+    scenarios = Scenarios(seed_value)
+    recorder = Recorder()
+    visitors = Visitors()
+
+    def one(record=True):
+        name, user, (method, path, data) = scenarios.pick()
+        sample = _measure(handler, visitors.get(user), method, path, data)
+        if record:
+            recorder.add(name, sample)
+
+    for _ in range(warmup):
+        one(record=False)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(one) for _ in range(requests)]:
+            future.result()
+    return recorder.summary(time.perf_counter() - started)
+
+
+def contention(seconds=10.0, readers=4, writers=4, seed_value=0):
+    """
+    Чтение под постоянной записью: writers потоков без пауз комментируют и
+    публикуют, readers потоков читают ленты. Возвращает итог по чтениям и
+    по записям отдельно.
+    """
+    handler = WSGIHandler()
+    scenarios = Scenarios(seed_value)
+    reads = [item[0] for item in scenarios.mix
+             if item[0] not in Scenarios.WRITES]
+    recorders = {'reads': Recorder(), 'writes': Recorder()}
+    visitors = Visitors()
+    deadline = time.perf_counter() + seconds
+
+    def loop(kind, names):
+        try:
+            while time.perf_counter() < deadline:
+                name, user, (method, path, data) = scenarios.pick(names)
+                recorders[kind].add(name, _measure(
+                    handler, visitors.get(user), method, path, data))
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=readers + writers) as pool:
+        futures = ([pool.submit(loop, 'reads', reads)
+                    for _ in range(readers)]
+                   + [pool.submit(loop, 'writes', Scenarios.WRITES)
+                      for _ in range(writers)])
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return {kind: recorder.summary(elapsed)
+            for kind, recorder in recorders.items()}
+
+
+def metadata(**options):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'created': timezone.now().isoformat(),
+            'options': options}
+
+
+def compare(current, baseline):
+    """Строки с изменением задержек и запросов относительно baseline."""
+    lines = []
+    for name, view in current['views'].items():
+        old = baseline.get('views', {}).get(name)
+        if not old:
+            lines.append(f'{name}: нет в базовом прогоне')
+            continue
+        parts = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries'):
+            if old[key]:
+                change = (view[key] - old[key]) / old[key] * 100
+                parts.append(f'{key} {old[key]:.1f} -> {view[key]:.1f} '
+                             f'({change:+.0f}%)')
+        lines.append(f'{name}: ' + ', '.join(parts))
+    return lines
+
+
+def dump(result, path):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(result, output, ensure_ascii=False, indent=2)
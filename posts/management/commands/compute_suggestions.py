@@ -0,0 +1,41 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+from posts.models import User
+
+
+def chunked(iterator, size):
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации подписок (друзья друзей с учётом '
+            'активности авторов) пачками в пуле процессов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--workers', type=int,
+                            default=settings.SUGGESTIONS_WORKERS,
+                            help='0 - считать в этом процессе')
+        parser.add_argument('--top', type=int,
+                            default=settings.SUGGESTIONS_PER_USER)
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('pk').values_list(
+            'pk', flat=True).iterator()
+        done = 0
+        for count in suggestions.compute(
+                chunked(user_ids, options['chunk_size']),
+                top=options['top'], workers=options['workers']):
+            done += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Обработано пользователей: {done}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны для {done} пользователей'))
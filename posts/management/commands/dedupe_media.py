@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.storage import acquire, discard, post_images, release
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов под имена по хешу содержимого, '
+            'одинаковые файлы остаются в одном экземпляре')
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').exclude(image=None).order_by(
+            'image').values_list('image', flat=True).distinct()
+        moved = missing = 0
+        for name in names.iterator():
+            if not post_images.exists(name):
+                missing += 1
+                continue
+            with post_images.open(name) as content:
+                new_name = post_images.save(name, content)
+            if new_name == name:
+                discard(name)
+                continue
+            with transaction.atomic():
+                count = Post.objects.filter(image=name).update(
+                    image=new_name, thumbnails='')
+                acquire(new_name, count)
+                release(name, count)
+            moved += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {moved}, не найдено: {missing}'))
+        if moved:
+            self.stdout.write('Запустите generate_thumbnails, чтобы '
+                              'пересоздать превью')
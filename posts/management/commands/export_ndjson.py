@@ -0,0 +1,35 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import ndjson
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии и подписки '
+            'в NDJSON (файл .gz сжимается)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл или - для stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        # при выгрузке в stdout отчёт идёт в stderr
+        report = self.stderr if path == '-' else self.stdout
+        if path == '-':
+            stream = sys.stdout
+        elif path.endswith('.gz'):
+            stream = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            stream = open(path, 'w', encoding='utf-8')
+        try:
+            progress = ndjson.export(
+                stream, chunk_size=options['chunk_size'],
+                on_chunk=lambda p: report.write(p.report())
+                if options['verbosity'] > 1 else None)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        report.write(self.style.SUCCESS('Выгружено: ' + progress.report()))
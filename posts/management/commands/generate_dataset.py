@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from posts import dataset
+
+
+class Command(BaseCommand):
+    help = ('Добавляет в базу синтетический набор данных: степенной граф '
+            'подписок со знаменитостями, неравные группы, картинки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=3000000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--follows-per-user', type=int, default=30)
+        parser.add_argument('--celebrities', type=int, default=20)
+        parser.add_argument('--image-share', type=float, default=0.1)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='не пересобирать ленты, счётчики и поиск')
+
+    def handle(self, *args, **options):
+        generator = dataset.DatasetGenerator(
+            users=options['users'],
+            posts=options['posts'],
+            comments=options['comments'],
+            groups=options['groups'],
+            follows_per_user=options['follows_per_user'],
+            celebrities=options['celebrities'],
+            image_share=options['image_share'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            on_progress=lambda p: self.stdout.write(p.report())
+            if options['verbosity'] > 1 else None,
+        )
+        progress = generator.generate()
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: ' + progress.report()))
+        if not options['skip_derived']:
+            dataset.rebuild_derived()
+            self.stdout.write(self.style.SUCCESS(
+                'Ленты, поиск и счётчики пересобраны'))
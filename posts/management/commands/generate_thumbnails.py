@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт превью для картинок уже опубликованных постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='пересоздать и уже готовые превью')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image=None).only(
+            'id', 'image', 'thumbnails').order_by('pk')
+        done = 0
+        for post in posts.iterator(chunk_size=options['chunk_size']):
+            thumbnails.generate(post, force=options['force'])
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}'))
@@ -0,0 +1,38 @@
+import gzip
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import ndjson
+
+
+class Command(BaseCommand):
+    help = ('Загружает NDJSON из export_ndjson пачками через bulk_create и '
+            'пересобирает производные данные')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='не пересобирать ленты, счётчики и поиск')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        opener = gzip.open if path.endswith('.gz') else open
+        importer = ndjson.Importer(
+            batch_size=options['batch_size'],
+            on_batch=lambda p: self.stdout.write(p.report())
+            if options['verbosity'] > 1 else None)
+        with opener(path, 'rt', encoding='utf-8') as lines:
+            progress = importer.load(lines)
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: ' + progress.report()))
+        if options['skip_derived']:
+            return
+        # bulk_create не вызывает сигналы, поэтому всё производное
+        # собирается заново, а кэш страниц и фрагментов сбрасывается
+        for command in ('rebuild_timelines', 'reconcile_counters',
+                        'rebuild_search_index', 'rebuild_trending'):
+            call_command(command, stdout=self.stdout)
+        cache.clear()
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import loadtest
+
+
+class Command(BaseCommand):
+    help = ('Засевает временную базу и гоняет основные страницы через '
+            'WSGIHandler из пула потоков, печатает процентили задержек, '
+            'число запросов к базе и время в ней')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--warmup', type=int, default=50)
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='множитель размера данных')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='куда записать JSON с итогом')
+        parser.add_argument('--compare', help='JSON прошлого прогона')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        self.stdout.write('Создаю данные...')
+        with loadtest.seeded_database(scale, options['seed']):
+            self.stdout.write('Гоняю запросы...')
+            summary = loadtest.run(requests=options['requests'],
+                                   threads=options['threads'],
+                                   warmup=options['warmup'],
+                                   seed_value=options['seed'])
+        result = {**loadtest.metadata(**{
+            key: options[key] for key in
+            ('requests', 'threads', 'warmup', 'scale', 'seed')}),
+            **summary}
+        self.print_summary(result)
+        if options['output']:
+            loadtest.dump(result, options['output'])
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline:
+                for line in loadtest.compare(result, json.load(baseline)):
+                    self.stdout.write(line)
+
+    def print_summary(self, result):
+        self.stdout.write(
+            f"{'сценарий':<16}{'запросов':>9}{'ошибок':>8}{'p50':>9}"
+            f"{'p95':>9}{'p99':>9}{'SQL':>7}{'БД мс':>8}")
+        for name, view in result['views'].items():
+            self.stdout.write(
+                f"{name:<16}{view['requests']:>9}{view['errors']:>8}"
+                f"{view['p50_ms']:>9.1f}{view['p95_ms']:>9.1f}"
+                f"{view['p99_ms']:>9.1f}{view['queries']:>7.1f}"
+                f"{view['db_ms']:>8.1f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Всего {result['requests']} запросов за "
+            f"{result['seconds']:.1f} с: {result['throughput_rps']:.0f} "
+            f"запросов/с, p50 {result['p50_ms']:.1f} мс, "
+            f"p95 {result['p95_ms']:.1f} мс, p99 {result['p99_ms']:.1f} мс"))
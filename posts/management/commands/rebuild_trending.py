@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ('Собирает рейтинг популярного заново по свежим комментариям и '
+            'постам, например после загрузки данных; с --prune только '
+            'удаляет устаревшие веса')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float,
+                            help='за сколько часов брать события')
+        parser.add_argument('--prune', action='store_true',
+                            help='удалить устаревшие веса (для cron)')
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            deleted = trending.prune()
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено устаревших весов: {deleted}'))
+            return
+        trending.rebuild(options['hours'])
+        self.stdout.write(self.style.SUCCESS('Рейтинг популярного собран'))
@@ -0,0 +1,62 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters, storage
+from posts.models import Post, User, UserStats
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с исходными таблицами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed_users = 0
+        user_ids = User.objects.order_by('pk').values_list(
+            'pk', flat=True).iterator()
+        while True:
+            chunk = list(islice(user_ids, options['chunk_size']))
+            if not chunk:
+                break
+            fixed_users += self.reconcile_users(chunk)
+
+        fixed_posts = 0
+        drift = counters.comments_count_drift().only('pk').iterator()
+        while True:
+            chunk = list(islice(drift, options['chunk_size']))
+            if not chunk:
+                break
+            for post in chunk:
+                post.comments_count = post.real_count
+            # пачка в одной транзакции, а не коммит на каждый пост
+            with transaction.atomic():
+                Post.objects.bulk_update(chunk, ['comments_count'])
+            fixed_posts += len(chunk)
+
+        # ссылки на картинки: bulk_create и loaddata сигналов не вызывают
+        fixed_images = storage.recount()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено пользователей: {fixed_users}, '
+            f'постов: {fixed_posts}, картинок: {fixed_images}'))
+
+    def reconcile_users(self, user_ids):
+        totals = counters.count_for(user_ids)
+        stored = UserStats.objects.in_bulk(user_ids)
+        created, changed = [], []
+        for user_id, values in totals.items():
+            stats = stored.get(user_id)
+            if stats is None:
+                created.append(UserStats(user_id=user_id, **values))
+                continue
+            if any(getattr(stats, field) != value
+                   for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(stats, field, value)
+                changed.append(stats)
+        UserStats.objects.bulk_create(created)
+        UserStats.objects.bulk_update(changed, list(counters.FIELDS))
+        return len(created) + len(changed)
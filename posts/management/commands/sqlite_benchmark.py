@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+
+from posts import loadtest
+
+# SQLite «из коробки»: журнал отката и отложенные транзакции
+DEFAULTS = {'journal_mode': 'DELETE'}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает чтение под постоянной записью с прагмами SQLite по '
+            'умолчанию и с настройками из SQLITE_PRAGMAS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10.0)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--scale', type=float, default=0.2,
+                            help='множитель размера данных')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        phases = [
+            ('по умолчанию', DEFAULTS, False, 0),
+            ('настроено', settings.SQLITE_PRAGMAS,
+             True, settings.DATABASES['default'].get('CONN_MAX_AGE', 0)),
+        ]
+        self.stdout.write('Создаю данные...')
+        with loadtest.seeded_database(options['scale'], options['seed']):
+            for label, pragmas, immediate, max_age in phases:
+                # новые соединения потоков возьмут прагмы и время жизни
+                connections.close_all()
+                connections.databases['default']['CONN_MAX_AGE'] = max_age
+                with override_settings(SQLITE_PRAGMAS=pragmas,
+                                       SQLITE_BEGIN_IMMEDIATE=immediate):
+                    connections['default'].ensure_connection()
+                    result = loadtest.contention(
+                        seconds=options['seconds'],
+                        readers=options['readers'],
+                        writers=options['writers'],
+                        seed_value=options['seed'])
+                self.print_phase(label, result)
+            connections.close_all()
+
+    def print_phase(self, label, result):
+        reads, writes = result['reads'], result['writes']
+        self.stdout.write(self.style.SUCCESS(label))
+        self.stdout.write(
+            f"  чтение: {reads['throughput_rps']:.0f} запросов/с, "
+            f"p50 {reads['p50_ms'] or 0:.1f} мс, "
+            f"p95 {reads['p95_ms'] or 0:.1f} мс, "
+            f"p99 {reads['p99_ms'] or 0:.1f} мс, "
+            f"ошибок {self.errors(reads)}")
+        self.stdout.write(
+            f"  запись: {writes['throughput_rps']:.0f} запросов/с, "
+            f"p95 {writes['p95_ms'] or 0:.1f} мс, "
+            f"ошибок {self.errors(writes)}")
+
+    @staticmethod
+    def errors(summary):
+        return sum(view['errors'] for view in summary['views'].values())
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.6 on 2026-10-18 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    stats = {user_id: UserStats(user_id=user_id)
+             for user_id in User.objects.values_list('pk', flat=True)}
+    queries = (
+        ('posts_count', Post.objects.values_list('author_id')),
+        ('followers_count', Follow.objects.values_list('author_id')),
+        ('following_count', Follow.objects.values_list('user_id')),
+    )
+    for field, queryset in queries:
+        for user_id, total in queryset.annotate(
+                total=Count('id')).order_by():
+            if user_id in stats:
+                setattr(stats[user_id], field, total)
+    UserStats.objects.bulk_create(stats.values())
+
+    for post_id, total in Comment.objects.exclude(post=None).values_list(
+            'post_id').annotate(total=Count('id')).order_by():
+        Post.objects.filter(pk=post_id).update(comments_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0032_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.IntegerField(default=0, verbose_name='Записей')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.IntegerField(default=0, verbose_name='Подписок')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
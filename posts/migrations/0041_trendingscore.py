@@ -0,0 +1,31 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0040_storedimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('posts', 'Пост'), ('groups', 'Группа')], max_length=10, verbose_name='Вид')),
+                ('object_id', models.IntegerField(verbose_name='id поста или группы')),
+                ('score', models.FloatField(verbose_name='Вес на момент epoch')),
+                ('epoch', models.FloatField(verbose_name='Точка отсчёта')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['kind', 'epoch'], name='trending_kind_epoch_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trendingscore',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_trending_score'),
+        ),
+    ]
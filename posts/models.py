@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import post_images
+
 User = get_user_model()
 
 
@@ -26,6 +28,12 @@ class Group(models.Model):
         return f'{self.title}'
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для ленты вместе с автором и группой одним запросом."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст',
@@ -35,6 +43,11 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    # версия поста для кэша карточек (posts.cards)
+    updated = models.DateTimeField(
+        'Изменён',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
@@ -50,10 +63,41 @@ class Post(models.Model):
         related_name='posts',
         help_text='Выберите группу'
     )
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image = models.ImageField(
+        upload_to='posts/',
+        storage=post_images,
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+    # адреса превью картинки в JSON, их пишет posts.thumbnails
+    thumbnails = models.TextField(
+        'Превью',
+        blank=True,
+        default='',
+        editable=False,
+    )
+    comments_count = models.IntegerField(
+        'Комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # ленты: общая, автора и группы. Индексы по возрастанию: SQLite
+        # дописывает к ключу rowid по возрастанию и читает индекс с конца,
+        # что даёт порядок (pub_date DESC, id DESC) без сортировки.
+        indexes = [
+            models.Index(fields=['pub_date'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -84,6 +128,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -105,3 +153,132 @@ class Follow(models.Model):
         related_name='following',
         null=True,
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        verbose_name='Читатель ленты',
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор поста',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        ordering = ['-pub_date', '-id']
+        unique_together = ['user', 'post']
+        indexes = [
+            models.Index(fields=['user', 'pub_date'],
+                         name='timeline_user_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, поддерживаемые при записи (posts.counters)."""
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.IntegerField('Записей', default=0)
+    followers_count = models.IntegerField('Подписчиков', default=0)
+    following_count = models.IntegerField('Подписок', default=0)
+
+    def __str__(self):
+        return f'{self.user_id}'
+
+
+class StoredImage(models.Model):
+    """Сколько постов ссылается на файл картинки (posts.storage)."""
+    name = models.CharField('Файл', max_length=100, primary_key=True)
+    refs = models.IntegerField('Ссылок', default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.refs}'
+
+
+class TrendingScore(models.Model):
+    """Вес поста или группы в популярном, приведённый к epoch (trending)."""
+    POSTS = 'posts'
+    GROUPS = 'groups'
+    KINDS = [(POSTS, 'Пост'), (GROUPS, 'Группа')]
+
+    kind = models.CharField('Вид', max_length=10, choices=KINDS)
+    object_id = models.IntegerField('id поста или группы')
+    score = models.FloatField('Вес на момент epoch')
+    epoch = models.FloatField('Точка отсчёта')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'],
+                                    name='unique_trending_score'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'epoch'],
+                         name='trending_kind_epoch_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}'
+
+
+class FollowSuggestion(models.Model):
+    """Рекомендация подписки, её считает команда compute_suggestions."""
+    user = models.ForeignKey(
+        User,
+        verbose_name='Кому',
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField('Вес')
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow_suggestion'),
+        ]
+        # рекомендации пользователя читаются одним проходом по индексу
+        indexes = [
+            models.Index(fields=['user', '-score'],
+                         name='suggestion_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
@@ -0,0 +1,186 @@
+"""
+Потоковые выгрузка и загрузка данных сайта в NDJSON.
+
+Каждая строка файла - одна запись: {"model": ..., "pk": ..., "fields": ...}.
+Выгрузка читает таблицы через values().iterator() кусками, загрузка
+разбирает файл построчно и пишет пачками через bulk_create, так что память
+не растёт с размером данных. Ключи пользователей и групп сопоставляются по
+username и slug, а id постов сдвигаются на текущий максимум таблицы, чтобы
+комментарии находили свои посты без словаря на все посты.
+"""
+import json
+import resource
+import time
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import follow_graph
+from .models import Comment, Follow, Group, Post, User
+
+# порядок важен: записи ссылаются только на уже загруженные модели
+MODELS = {
+    'auth.user': (User, ['username', 'first_name', 'last_name', 'email',
+                         'password', 'is_active', 'is_staff',
+                         'is_superuser', 'date_joined', 'last_login']),
+    'posts.group': (Group, ['title', 'slug', 'description']),
+    'posts.post': (Post, ['text', 'pub_date', 'author', 'group', 'image']),
+    'posts.comment': (Comment, ['post', 'author', 'text', 'created']),
+    'posts.follow': (Follow, ['user', 'author']),
+}
+
+
+class Progress:
+    """Считает записи и сообщает скорость и пик памяти процесса."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.rows = 0
+
+    def report(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        # ru_maxrss в Linux - килобайты
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return (f'{self.rows} записей за {elapsed:.1f} с, '
+                f'{self.rows / elapsed:.0f} записей/с, '
+                f'пик памяти {peak:.0f} МБ')
+
+
+def _column(model, name):
+    field = model._meta.get_field(name)
+    return field.attname
+
+
+def export(stream, chunk_size=2000, progress=None, on_chunk=None):
+    """Пишет все модели из MODELS в stream по строке на запись."""
+    progress = progress or Progress()
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for label, (model, fields) in MODELS.items():
+        columns = [_column(model, name) for name in fields]
+        rows = model.objects.order_by('pk').values_list('pk', *columns)
+        for row in rows.iterator(chunk_size=chunk_size):
+            stream.write(encoder.encode({
+                'model': label,
+                'pk': row[0],
+                'fields': dict(zip(fields, row[1:])),
+            }))
+            stream.write('\n')
+            progress.rows += 1
+            if on_chunk and progress.rows % chunk_size == 0:
+                on_chunk(progress)
+    return progress
+
+
+@contextmanager
+def keep_dates(*fields):
+    """Отключает auto_now_add, чтобы даты из файла не заменялись текущей."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Importer:
+    def __init__(self, batch_size=2000, progress=None, on_batch=None):
+        self.batch_size = batch_size
+        self.progress = progress or Progress()
+        self.on_batch = on_batch
+        self.users = {}
+        self.groups = {}
+        self.post_offset = Post.objects.aggregate(
+            top=Max('pk'))['top'] or 0
+        self.pending = []
+        self.pending_label = None
+
+    def load(self, lines):
+        with keep_dates(Post._meta.get_field('pub_date'),
+                        Comment._meta.get_field('created')):
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record['model'] not in MODELS:
+                    continue
+                if (record['model'] != self.pending_label
+                        or len(self.pending) >= self.batch_size):
+                    self.flush()
+                    self.pending_label = record['model']
+                self.pending.append(record)
+            self.flush()
+        self.reset_sequences()
+        return self.progress
+
+    def flush(self):
+        if not self.pending:
+            return
+        handler = getattr(self, 'load_' + self.pending_label.split('.')[1])
+        with transaction.atomic():
+            handler(self.pending)
+        self.progress.rows += len(self.pending)
+        self.pending = []
+        if self.on_batch:
+            self.on_batch(self.progress)
+
+    def _by_natural_key(self, records, model, key, mapping, build):
+        values = [record['fields'][key] for record in records]
+        existing = dict(model.objects.filter(
+            **{f'{key}__in': values}).values_list(key, 'pk'))
+        model.objects.bulk_create(
+            [build(record['fields']) for record in records
+             if record['fields'][key] not in existing],
+            ignore_conflicts=True)
+        existing = dict(model.objects.filter(
+            **{f'{key}__in': values}).values_list(key, 'pk'))
+        for record in records:
+            mapping[record['pk']] = existing[record['fields'][key]]
+
+    def load_user(self, records):
+        self._by_natural_key(records, User, 'username', self.users,
+                             lambda fields: User(**fields))
+
+    def load_group(self, records):
+        self._by_natural_key(records, Group, 'slug', self.groups,
+                             lambda fields: Group(**fields))
+
+    def load_post(self, records):
+        Post.objects.bulk_create([Post(
+            pk=record['pk'] + self.post_offset,
+            text=record['fields']['text'],
+            pub_date=record['fields']['pub_date'],
+            author_id=self.users[record['fields']['author']],
+            group_id=self.groups.get(record['fields']['group']),
+            image=record['fields']['image'] or '',
+        ) for record in records])
+
+    def load_comment(self, records):
+        Comment.objects.bulk_create([Comment(
+            post_id=(None if record['fields']['post'] is None
+                     else record['fields']['post'] + self.post_offset),
+            author_id=self.users[record['fields']['author']],
+            text=record['fields']['text'],
+            created=record['fields']['created'],
+        ) for record in records])
+
+    def load_follow(self, records):
+        Follow.objects.bulk_create([Follow(
+            user_id=self.users.get(record['fields']['user']),
+            author_id=self.users.get(record['fields']['author']),
+        ) for record in records], ignore_conflicts=True)
+        # bulk_create не вызывает сигналы
+        transaction.on_commit(follow_graph.reset)
+
+    def reset_sequences(self):
+        # id постов заданы явно; PostgreSQL иначе выдаст занятые значения
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment, Follow])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,83 @@
+"""
+Кэш целых страниц для анонимных посетителей.
+
+Ответ view сохраняется вместе со снимком версий тегов, от которых зависит
+страница (лента, группа, автор, пост). Запись в posts.signals увеличивает
+версии затронутых тегов, и устаревшая страница при следующем чтении
+считается промахом. Теги строятся из параметров URL (slug, username,
+post_id), поэтому известны ещё до вызова view. Попадания и промахи
+считает метрика yatube_page_cache_total в core.metrics.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core import metrics
+
+
+def _tag_key(tag):
+    return f'page-tag:{tag}'
+
+
+def tag_versions(tags):
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, int(time.time() * 1000), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*tags):
+    for tag in tags:
+        try:
+            cache.incr(_tag_key(tag))
+        except ValueError:
+            # версии нет — значит, и страниц с этим тегом в кэше нет
+            pass
+
+
+def cache_anonymous_page(get_tags):
+    """
+    Кэширует GET-ответы view для анонимных пользователей.
+    get_tags(**kwargs) возвращает теги страницы по параметрам URL.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            path = request.get_full_path().encode()
+            key = 'page:' + hashlib.md5(path).hexdigest()
+            tags = get_tags(**kwargs)
+            entry = cache.get(key)
+            if entry is not None:
+                versions, content, content_type = entry
+                if versions == tag_versions(tags):
+                    metrics.inc('yatube_page_cache_total', result='hit')
+                    response = HttpResponse(content,
+                                            content_type=content_type)
+                    response['X-Page-Cache'] = 'hit'
+                    return response
+            # устаревшая страница тоже промах, хотя ключ в кэше нашёлся
+            metrics.inc('yatube_page_cache_total', result='miss')
+            # версии снимаем до рендера: запись во время рендера
+            # сделает сохранённую страницу устаревшей, а не потеряется
+            versions = tag_versions(tags)
+            response = view(request, *args, **kwargs)
+            if (response.status_code == 200
+                    and not response.streaming
+                    and not response.cookies):
+                cache.set(key,
+                          (versions, response.content,
+                           response['Content-Type']),
+                          settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,216 @@
+"""
+Пагинация лент постов.
+
+Основной режим — keyset-пагинация по паре (дата, id): страница выбирается
+по непрозрачному курсору ?after= / ?before=, поэтому любая страница стоит
+столько же, сколько первая. Старые ссылки вида ?page=N продолжают работать:
+для них общее число записей берётся из кэша, а не из COUNT(*) на каждый запрос.
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+def encode_cursor(stamp, pk):
+    raw = f'{stamp.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (дата, id) или None для битого курсора."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        stamp, pk = raw.decode().split('|')
+        stamp = parse_datetime(stamp)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if stamp is None:
+        return None
+    return stamp, pk
+
+
+def key_values(obj, keys):
+    """Значения ключей курсора у модели или у строки values()."""
+    if isinstance(obj, dict):
+        return tuple(obj[key] for key in keys)
+    return tuple(getattr(obj, key) for key in keys)
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинатор от новых записей к старым.
+
+    Не выполняет ни OFFSET, ни COUNT(*): чтобы узнать, есть ли следующая
+    страница, выбирается на одну запись больше. Номер страницы условный —
+    он нужен только для has_next()/has_previous() стандартного Page.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 after=None, before=None):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self.after = decode_cursor(after)
+        self.before = decode_cursor(before)
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def num_pages(self):
+        return self._number + int(self._has_next)
+
+    def _cursor(self, obj):
+        return encode_cursor(*key_values(obj, self.keys))
+
+    def _older(self, cursor):
+        date_key, id_key = self.keys
+        stamp, pk = cursor
+        # (date, id) < (stamp, pk) в виде, который использует индекс по дате
+        return self.object_list.filter(
+            **{f'{date_key}__lte': stamp}
+        ).exclude(
+            **{date_key: stamp, f'{id_key}__gte': pk}
+        ).order_by(f'-{date_key}', f'-{id_key}')
+
+    def _newer(self, cursor):
+        date_key, id_key = self.keys
+        stamp, pk = cursor
+        return self.object_list.filter(
+            **{f'{date_key}__gte': stamp}
+        ).exclude(
+            **{date_key: stamp, f'{id_key}__lte': pk}
+        ).order_by(date_key, id_key)
+
+    def _fetch(self, queryset):
+        rows = list(queryset[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def page(self, number=None):
+        date_key, id_key = self.keys
+        newest = self.object_list.order_by(f'-{date_key}', f'-{id_key}')
+        has_previous = False
+        if self.before:
+            rows, has_previous = self._fetch(self._newer(self.before))
+            rows.reverse()
+            has_next = True
+            if not has_previous:
+                # дошли до начала ленты: показываем первую страницу целиком
+                rows, has_next = self._fetch(newest)
+        elif self.after:
+            rows, has_next = self._fetch(self._older(self.after))
+            has_previous = True
+        else:
+            rows, has_next = self._fetch(newest)
+        if rows and has_next:
+            self.next_cursor = self._cursor(rows[-1])
+        if rows and has_previous:
+            self.previous_cursor = self._cursor(rows[0])
+        self._number = 2 if has_previous else 1
+        self._has_next = has_next
+        return Page(rows, self._number, self)
+
+    def get_page(self, number=None):
+        return self.page()
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Нумерованный пагинатор, который не считает записи на каждый запрос.
+
+    Общее число записей передаётся готовым (count=) или берётся из кэша по
+    ключу count_key. Ключи лент сбрасываются при публикации и удалении
+    постов (posts.signals), а в остальном живут FEED_COUNT_TIMEOUT секунд,
+    так что число может быть приблизительным.
+    """
+
+    def __init__(self, object_list, per_page, count=None, count_key=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+        self.count_key = count_key
+
+    def _real_count(self):
+        try:
+            return self.object_list.count()
+        except (AttributeError, TypeError):
+            return len(self.object_list)
+
+    @cached_property
+    def count(self):
+        if self._count is not None:
+            return self._count
+        if self.count_key is None:
+            return self._real_count()
+        total = cache.get(self.count_key)
+        if total is None:
+            total = self._real_count()
+            cache.set(self.count_key, total, settings.FEED_COUNT_TIMEOUT)
+        return total
+
+
+def keyset_chunk(queryset, per_page, keys=('pub_date', 'id'), after=None):
+    """
+    Порция записей после курсора after и курсор следующей порции.
+
+    В отличие от CursorPaginator порция остаётся QuerySet, её можно отдать
+    в шаблон как есть. Есть ли продолжение, узнаёт отдельный EXISTS по тому
+    же индексу.
+    """
+    paginator = CursorPaginator(queryset, per_page, keys=keys, after=after)
+    if paginator.after:
+        chunk = paginator._older(paginator.after)
+    else:
+        chunk = queryset.order_by(*(f'-{key}' for key in keys))
+    chunk = chunk[:per_page]
+    rows = list(chunk)
+    if len(rows) < per_page:
+        return chunk, None
+    last = key_values(rows[-1], keys)
+    if not paginator._older(last).exists():
+        return chunk, None
+    return chunk, encode_cursor(*last)
+
+
+def page_window(number, num_pages, on_each_side=2, on_ends=1):
+    """
+    Номера страниц вокруг текущей и по краям; None обозначает пропуск.
+    Например, для 7-й страницы из 100: 1, None, 5, 6, 7, 8, 9, None, 100.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    if number > on_each_side + on_ends + 1:
+        window += list(range(1, on_ends + 1)) + [None]
+        start = number - on_each_side
+    else:
+        start = 1
+    if number < num_pages - on_each_side - on_ends:
+        window += list(range(start, number + on_each_side + 1)) + [None]
+        window += list(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window += list(range(start, num_pages + 1))
+    return window
+
+
+def paginate(request, object_list, keys=('pub_date', 'id'),
+             count=None, count_key=None):
+    """Возвращает страницу ленты по параметрам запроса."""
+    per_page = settings.COUNT_POSTS_IN_PAGE
+    if 'page' in request.GET:
+        paginator = CachedCountPaginator(object_list, per_page, count=count,
+                                         count_key=count_key)
+        return paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(object_list, per_page, keys=keys,
+                                after=request.GET.get('after'),
+                                before=request.GET.get('before'))
+    return paginator.get_page()
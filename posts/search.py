@@ -0,0 +1,91 @@
+"""
+Полнотекстовый поиск по постам на SQLite FTS5.
+
+Текст постов дублируется в виртуальную таблицу posts_post_fts (rowid —
+id поста), результаты ранжируются по bm25. Индекс обновляется из
+posts.signals при создании, правке и удалении поста, полностью
+пересобирается командой rebuild_search_index.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def to_match(query):
+    """Строка поиска в запрос FTS5: все слова, каждое как префикс."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def index_post(post):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.id])
+        cursor.execute(f'INSERT INTO {TABLE}(rowid, text) VALUES (%s, %s)',
+                       [post.id, post.text])
+
+
+def unindex_post(post_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(f'INSERT INTO {TABLE}(rowid, text) '
+                       f'SELECT id, text FROM {Post._meta.db_table}')
+
+
+def matching_ids(query):
+    """Подзапрос с id подходящих постов — для фильтра pk__in."""
+    return RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+                  [to_match(query)])
+
+
+class SearchResults:
+    """
+    Результаты поиска в виде последовательности для пагинатора: срез
+    выбирает нужные id по рангу в FTS5, а посты догружаются по первичному
+    ключу вместе с автором и группой.
+    """
+
+    def __init__(self, query):
+        self.match = to_match(query)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {TABLE} '
+                           f'WHERE {TABLE} MATCH %s', [self.match])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            raise TypeError('Результаты поиска поддерживают только срезы')
+        if not self.match:
+            return []
+        start = item.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {TABLE} '
+                           f'WHERE {TABLE} MATCH %s '
+                           f'ORDER BY bm25({TABLE}) LIMIT %s OFFSET %s',
+                           [self.match, item.stop - start, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
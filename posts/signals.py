@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (counters, feed_cache, follow_graph, images, page_cache,
+               search, storage, thumbnails, timeline, trending, updates)
+from .models import Comment, Follow, Group, Post, User
+
+
+def reset_feed_counts(post):
+    keys = ['feed-count:index']
+    if post.group_id:
+        keys.append(f'feed-count:group:{post.group_id}')
+    keys += [f'feed-count:follow:{user_id}' for user_id in
+             follow_graph.followers(post.author_id)]
+    cache.delete_many(keys)
+
+
+def invalidate_post_pages(post, group_ids=()):
+    """Сбрасывает кэш страниц, на которых показан пост."""
+    tags = ['index', f'post:{post.id}', f'author:{post.author.username}']
+    group_ids = {post.group_id, *group_ids} - {None}
+    tags += [f'group:{slug}' for slug in Group.objects.filter(
+        id__in=group_ids).values_list('slug', flat=True)]
+    page_cache.invalidate(*tags)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    # свежую загрузку картинки сначала обработает posts.images
+    instance._new_upload = bool(instance.image) and not getattr(
+        instance.image, '_committed', True)
+    # при смене группы пост пропадает со страницы прежней группы,
+    # а прежняя картинка может остаться без ссылок
+    instance._old_group_id = instance._old_image = None
+    if instance.pk and not raw:
+        old = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image').first()
+        if old is not None:
+            instance._old_group_id, instance._old_image = old
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if getattr(instance, '_new_upload', False):
+        images.schedule(instance)
+    else:
+        thumbnails.generate(instance)
+    # ссылки на файлы меняются в той же транзакции, что и сам пост
+    old_image = getattr(instance, '_old_image', None) or None
+    new_image = instance.image.name or None
+    if new_image != old_image:
+        if new_image:
+            storage.acquire(new_image)
+        storage.release(old_image)
+    if created:
+        updates.publish(instance, timeline.fan_out_post(instance))
+        trending.record(instance, settings.TRENDING_WEIGHTS['post'])
+        counters.bump(instance.author_id, posts_count=1)
+        reset_feed_counts(instance)
+    search.index_post(instance)
+    feed_cache.bump()
+    invalidate_post_pages(instance, [instance._old_group_id])
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if instance.image:
+        storage.release(instance.image.name)
+    counters.bump(instance.author_id, posts_count=-1)
+    search.unindex_post(instance.id)
+    reset_feed_counts(instance)
+    feed_cache.bump()
+    invalidate_post_pages(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.post_id:
+        counters.bump_comments(instance.post_id, 1)
+        feed_cache.bump()
+        invalidate_post_pages(instance.post)
+        trending.record(instance.post, settings.TRENDING_WEIGHTS['comment'])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id:
+        counters.bump_comments(instance.post_id, -1)
+        feed_cache.bump()
+        post = Post.objects.filter(pk=instance.post_id).first()
+        if post is not None:
+            invalidate_post_pages(post)
+
+
+def invalidate_follow_pages(follow):
+    """Счётчики подписок видны на страницах обоих пользователей."""
+    page_cache.invalidate(*(
+        f'author:{username}' for username in User.objects.filter(
+            pk__in=[follow.user_id, follow.author_id]).values_list(
+            'username', flat=True)))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.user_id and instance.author_id:
+        timeline.add_author(instance.user_id, instance.author_id)
+        counters.bump(instance.user_id, following_count=1)
+        counters.bump(instance.author_id, followers_count=1)
+        cache.delete(f'feed-count:follow:{instance.user_id}')
+        feed_cache.bump()
+        invalidate_follow_pages(instance)
+        follow_graph.changed('add', instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+    counters.bump(instance.user_id, following_count=-1)
+    counters.bump(instance.author_id, followers_count=-1)
+    cache.delete(f'feed-count:follow:{instance.user_id}')
+    feed_cache.bump()
+    invalidate_follow_pages(instance)
+    follow_graph.changed('remove', instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate(f'author:{instance.username}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate(f'group:{instance.slug}')
+
+
+@receiver(post_migrate)
+def database_migrated(sender, **kwargs):
+    # миграции и flush меняют базу в обход сигналов
+    follow_graph.reset()
@@ -0,0 +1,165 @@
+"""
+Хранилище картинок постов, где имя файла - хеш его содержимого.
+
+Загрузка копируется на диск кусками, а sha256 считается по дороге, так что
+файл целиком в память не попадает. Одинаковые файлы получают одно имя и
+хранятся один раз.
+
+Число постов с картинкой хранит строка StoredImage и меняется через F() в
+транзакции записи поста. Сохранение файла сразу берёт ссылку, и первый пост
+потока с этим именем (acquire()) забирает её себе; release() отдаёт ссылку,
+а файл удаляется после коммита, только если под блокировкой строки ссылок
+не осталось. Пока сохранение держит ссылку, удалить файл никто не успеет.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+import threading
+from collections import Counter
+from functools import partial
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+_local = threading.local()
+
+
+def _unclaimed():
+    # ссылки, взятые сохранением файла в этом потоке и ещё не отданные посту
+    if not hasattr(_local, 'unclaimed'):
+        _local.unclaimed = Counter()
+    return _local.unclaimed
+
+
+def _take(name, count):
+    """Добавляет ссылки на файл; True, если строки для него ещё не было."""
+    from .models import StoredImage
+    if StoredImage.objects.filter(name=name).update(refs=F('refs') + count):
+        return False
+    try:
+        with transaction.atomic():
+            StoredImage.objects.create(name=name, refs=count)
+    except IntegrityError:
+        # строку успел создать параллельный запрос
+        StoredImage.objects.filter(name=name).update(refs=F('refs') + count)
+        return False
+    return True
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    chunk_size = 64 * 1024
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        os.makedirs(self.location, exist_ok=True)
+        # временный файл лежит в том же разделе, поэтому переименование
+        # в итоговое имя атомарно
+        fd, temp_path = tempfile.mkstemp(dir=self.location, prefix='.upload-')
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    temp.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = posixpath.join(directory, hexdigest[:2],
+                                  hexdigest + extension)
+            path = self.path(name)
+            with transaction.atomic():
+                # без строки файл мог удалить release(), кладём его заново
+                if not _take(name, 1) and os.path.exists(path):
+                    os.remove(temp_path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                    os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        _unclaimed()[name] += 1
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # имя всё равно заменит хеш, а совпадение имён здесь не конфликт
+        return name
+
+
+post_images = ContentAddressedStorage()
+
+
+def acquire(name, count=1):
+    """Отмечает, что на файл стали ссылаться ещё count постов."""
+    unclaimed = _unclaimed()
+    claimed = min(unclaimed[name], count)
+    unclaimed[name] -= claimed
+    if count > claimed:
+        _take(name, count - claimed)
+
+
+def release(name, count=1):
+    """
+    Снимает count ссылок с файла; файл и его превью удаляются после коммита,
+    если ссылок не осталось.
+    """
+    from .models import StoredImage
+    if not name:
+        return
+    StoredImage.objects.filter(name=name).update(refs=F('refs') - count)
+    transaction.on_commit(partial(_collect, name))
+
+
+def discard(name):
+    """Отдаёт ссылку сохранения, если файл так и не достался посту."""
+    acquire(name)
+    release(name)
+
+
+def _collect(name):
+    from sorl.thumbnail import delete
+    from sorl.thumbnail.images import ImageFile
+
+    from .models import StoredImage
+    with transaction.atomic():
+        # DELETE блокирует строку: параллельное сохранение того же файла
+        # либо успело добавить ссылку, либо создаст строку и файл заново
+        deleted, _ = StoredImage.objects.filter(name=name,
+                                                refs__lte=0).delete()
+        if not deleted:
+            return
+        try:
+            delete(ImageFile(name, post_images))
+        except SuspiciousFileOperation:
+            # путь вне MEDIA_ROOT хранилищу не принадлежит
+            pass
+
+
+def recount():
+    """
+    Пересчитывает ссылки по постам после bulk_create и loaddata, которые
+    сигналов не вызывают. Возвращает число исправленных строк.
+    """
+    from django.db.models import Count
+
+    from .models import Post, StoredImage
+    with_image = Post.objects.exclude(image='').exclude(image=None)
+    counts = dict(with_image.values_list('image').annotate(
+        refs=Count('pk')).order_by())
+    with transaction.atomic():
+        stored = dict(StoredImage.objects.values_list('name', 'refs'))
+        changed = [StoredImage(name=name, refs=counts.get(name, 0))
+                   for name, refs in stored.items()
+                   if refs != counts.get(name, 0)]
+        created = [StoredImage(name=name, refs=refs)
+                   for name, refs in counts.items() if name not in stored]
+        StoredImage.objects.bulk_update(changed, ['refs'], batch_size=1000)
+        StoredImage.objects.bulk_create(created, batch_size=1000)
+    # ссылки сохранений этого потока учтены выше по постам
+    _unclaimed().clear()
+    return len(changed) + len(created)
@@ -0,0 +1,136 @@
+"""
+Рекомендации «на кого подписаться».
+
+Кандидаты - авторы, на которых подписаны авторы пользователя (друзья
+друзей). Вес кандидата - число таких общих подписок, умноженное на
+1 + ln(1 + записей за SUGGESTIONS_ACTIVITY_DAYS): активные авторы выше.
+Тем, кому друзей друзей не хватает, добавляются популярные активные авторы
+с весом меньше единицы, то есть всегда ниже любого друга друга.
+
+Считает всё команда compute_suggestions: пользователи делятся на пачки,
+пачки обрабатывает пул процессов, у каждого процесса свой граф подписок.
+Модели Django здесь импортируются внутри функций: дочерний процесс сначала
+вызывает django.setup().
+"""
+import heapq
+import math
+import multiprocessing
+from collections import Counter
+
+_context = None
+
+
+class Context:
+    """Граф подписок и активность авторов, общие для всех пачек."""
+
+    def __init__(self, top):
+        from datetime import timedelta
+
+        from django.conf import settings
+        from django.db.models import Count
+        from django.utils import timezone
+
+        from .follow_graph import FollowGraph
+        from .models import Post
+        self.top = top
+        self.graph = FollowGraph.load()
+        since = timezone.now() - timedelta(
+            days=settings.SUGGESTIONS_ACTIVITY_DAYS)
+        self.activity = dict(Post.objects.filter(
+            pub_date__gte=since).values_list('author_id').annotate(
+            Count('id')).order_by())
+        popular = [(self.boost(author_id) * len(ids), author_id)
+                   for author_id, ids in self.graph.followers.items()]
+        # делим на наибольший вес с запасом: любой популярный легче единицы,
+        # а друг друга весит не меньше неё
+        most = max((score for score, _ in popular), default=0) + 1
+        popular = [(score / most, author_id) for score, author_id in popular]
+        # с запасом: часть популярных у пользователя уже в подписках
+        self.popular = heapq.nlargest(top * 4, popular)
+
+    def boost(self, author_id):
+        return 1 + math.log1p(self.activity.get(author_id, 0))
+
+    def suggest(self, user_id):
+        """До top пар (вес, автор) для пользователя, тяжёлые первыми."""
+        followed = self.graph.following.get(user_id, ())
+        counts = Counter()
+        for friend_id in followed:
+            counts.update(self.graph.following.get(friend_id, ()))
+        exclude = {user_id, *followed}
+        best = heapq.nlargest(self.top, (
+            (count * self.boost(author_id), author_id)
+            for author_id, count in counts.items()
+            if author_id not in exclude))
+        exclude.update(author_id for _, author_id in best)
+        for score, author_id in self.popular:
+            if len(best) >= self.top:
+                break
+            if author_id not in exclude:
+                best.append((score, author_id))
+        return best
+
+
+def _init_worker(top):
+    global _context
+    import django
+    django.setup()
+    _context = Context(top)
+
+
+def compute_chunk(user_ids):
+    """Рекомендации пачки пользователей: [(user_id, [(вес, автор)])]."""
+    return [(user_id, _context.suggest(user_id)) for user_id in user_ids]
+
+
+def _save(user_ids, results):
+    from django.db import transaction
+
+    from .models import FollowSuggestion
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FollowSuggestion.objects.bulk_create([
+            FollowSuggestion(user_id=user_id, author_id=author_id,
+                             score=score)
+            for user_id, best in results for score, author_id in best])
+
+
+def compute(chunks, top, workers):
+    """
+    Считает и сохраняет рекомендации по пачкам id пользователей, отдавая
+    число обработанных пользователей после каждой пачки.
+    """
+    global _context
+    if not workers:
+        _context = Context(top)
+        for user_ids in chunks:
+            _save(user_ids, compute_chunk(user_ids))
+            yield len(user_ids)
+        return
+    # пачки готовим заранее: пул читает их из своего потока, а соединение
+    # с базой у каждого потока своё
+    chunks = list(chunks)
+    # пул на время одного пересчёта: граф в процессах устаревает
+    pool = multiprocessing.get_context('spawn').Pool(
+        workers, initializer=_init_worker, initargs=(top,))
+    try:
+        for results in pool.imap_unordered(compute_chunk, chunks):
+            _save([user_id for user_id, _ in results], results)
+            yield len(results)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def for_user(user):
+    """Рекомендации для показа: один запрос по индексу (user, -score)."""
+    from django.conf import settings
+
+    from .models import FollowSuggestion
+    if not user.is_authenticated:
+        return []
+    # подписки могли появиться уже после пересчёта: они отсекаются в том же
+    # запросе
+    return list(FollowSuggestion.objects.filter(user=user).exclude(
+        author__following__user=user).select_related('author')[
+        :settings.SUGGESTIONS_PER_USER])
@@ -0,0 +1,10 @@
+from django import template
+
+from posts.paginator import page_window as _page_window
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page):
+    return _page_window(page.number, page.paginator.num_pages)
@@ -0,0 +1,20 @@
+from collections.abc import Iterable
+
+from django import template
+
+from posts import cards, thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail_url(post, alias):
+    return thumbnails.url(post, alias)
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов из кэша; одиночный пост тоже можно передать."""
+    if not isinstance(posts, Iterable):
+        posts = [posts]
+    return cards.render(posts, context.get('user'))
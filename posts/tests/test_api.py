@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(COUNT_POSTS_IN_PAGE=2, COMMENTS_PER_PAGE=1)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Lev',
+                                              first_name='Лев')
+        cls.reader = User.objects.create_user(username='Olga')
+        cls.group = Group.objects.create(title='Книги', slug='books')
+        cls.posts = [Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                         group=cls.group)
+                     for i in range(3)]
+        for text in ('Первый', 'Второй'):
+            Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                                   text=text)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        counters.for_user(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_is_paged_by_cursor_in_one_query(self):
+        """Лента отдаётся курсорными страницами одним запросом."""
+        with self.assertNumQueries(1):
+            first = self.client.get(reverse('api:index')).json()
+        self.assertEqual([post['text'] for post in first['results']],
+                         ['Пост 2', 'Пост 1'])
+        self.assertEqual(first['results'][0]['author'], 'Lev')
+        self.assertEqual(first['results'][0]['group'], 'books')
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([post['text'] for post in second['results']],
+                         ['Пост 0'])
+        self.assertIsNone(second['next'])
+
+    def test_fields_select_compact_rows(self):
+        """?fields= оставляет только запрошенные поля."""
+        response = self.client.get(reverse('api:group', args=['books']),
+                                   {'fields': 'id,text,unknown'})
+        self.assertEqual(response.json()['results'][0],
+                         {'id': self.posts[2].id, 'text': 'Пост 2'})
+        self.assertIn('fields=id%2Ctext', response.json()['next'])
+
+    def test_etag_gives_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304."""
+        url = reverse('api:profile', args=['Lev'])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['posts_count'], 3)
+        self.assertEqual(response.json()['followers_count'], 1)
+        repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat['ETag'], response['ETag'])
+
+    def test_follow_feed_and_post(self):
+        """Лента подписок требует входа, пост отдаётся с комментариями."""
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        client = Client()
+        client.force_login(self.reader)
+        results = client.get(url, {'fields': 'id'}).json()['results']
+        self.assertEqual(results, [{'id': self.posts[2].id},
+                                   {'id': self.posts[1].id}])
+        data = self.client.get(
+            reverse('api:post_view', args=[self.posts[0].id])).json()
+        self.assertEqual(data['comments_count'], 2)
+        self.assertEqual([c['text'] for c in data['comments']], ['Второй'])
+        self.assertTrue(data['comments_next'].startswith(
+            reverse('api:post_comments', args=[self.posts[0].id])))
+        rest = self.client.get(data['comments_next']).json()
+        self.assertEqual([c['text'] for c in rest['results']], ['Первый'])
+        self.assertIsNone(rest['next'])
+        self.assertEqual(self.client.get(
+            reverse('api:post_comments', args=[0])).status_code, 404)
+        self.assertEqual(
+            self.client.post(reverse('api:index')).status_code, 405)
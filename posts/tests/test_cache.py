@@ -0,0 +1,81 @@
+from django.core.cache import caches
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Comment, Follow, Post, User
+
+
+class FeedFragmentCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(text='Первый пост', author=cls.author)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_new_post_shows_up_at_once(self):
+        """Новый пост виден сразу, несмотря на кэш фрагмента."""
+        self.client.get(reverse('posts:index'))
+        Post.objects.create(text='Свежий пост', author=self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_follow_feed_does_not_reuse_index_fragment(self):
+        """Лента подписок и общая лента кэшируются раздельно."""
+        Post.objects.create(text='Пост не из подписок',
+                            author=User.objects.create_user(username='X'))
+        self.reader_client.get(reverse('posts:index'))
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, 'Пост не из подписок')
+        self.assertContains(response, 'Первый пост')
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.post = Post.objects.create(text='Первый пост', author=cls.author)
+
+    def setUp(self):
+        caches['default'].clear()
+        metrics.reset()
+
+    def test_anonymous_pages_are_cached(self):
+        """Повторный запрос анонима отдаётся из кэша."""
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        text = metrics.render()
+        self.assertIn('yatube_page_cache_total{result="hit"} 1', text)
+        self.assertIn('yatube_page_cache_total{result="miss"} 1', text)
+
+    def test_writes_invalidate_dependent_pages(self):
+        """Комментарий сбрасывает страницы поста и лент, где он виден."""
+        post_url = reverse('posts:post_view',
+                           kwargs={'username': self.author,
+                                   'post_id': self.post.id})
+        index_url = reverse('posts:index')
+        self.client.get(post_url)
+        self.client.get(index_url)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Новый комментарий')
+        response = self.client.get(post_url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Новый комментарий')
+        self.assertEqual(self.client.get(index_url)['X-Page-Cache'], 'miss')
+
+    def test_authorized_users_bypass_cache(self):
+        """Авторизованным пользователям страницы не кэшируются."""
+        client = Client()
+        client.force_login(self.author)
+        client.get(reverse('posts:index'))
+        self.assertNotIn('X-Page-Cache',
+                         client.get(reverse('posts:index')))
@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import cards
+from posts.models import Comment, Post, User
+
+
+class PostCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Savva')
+        self.reader = User.objects.create_user(username='Luka')
+        self.post = Post.objects.create(text='Первый текст',
+                                        author=self.author)
+
+    def get_post(self):
+        return Post.objects.feed().get(pk=self.post.pk)
+
+    def test_card_is_rendered_once(self):
+        """Повторная сборка ленты берёт карточку из кэша."""
+        cards.render([self.get_post()])
+        with mock.patch('posts.cards.render_to_string') as render:
+            html = cards.render([self.get_post()])
+        render.assert_not_called()
+        self.assertIn('Первый текст', html)
+
+    def test_changes_give_new_version(self):
+        """Правка текста и новый комментарий меняют ключ карточки."""
+        before = cards.key(self.get_post())
+        self.post.text = 'Второй текст'
+        self.post.save()
+        edited = cards.key(self.get_post())
+        self.assertNotEqual(before, edited)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.assertNotEqual(edited, cards.key(self.get_post()))
+        self.client.force_login(self.reader)
+        response = self.client.get('/')
+        self.assertContains(response, 'Второй текст')
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_edit_link_only_for_author(self):
+        """Ссылка «Редактировать» не попадает в кэш для чужих."""
+        self.client.force_login(self.author)
+        url = f'/{self.author.username}/{self.post.id}/'
+        self.assertContains(self.client.get(url), 'Редактировать')
+        self.client.force_login(self.reader)
+        self.assertNotContains(self.client.get(url), 'Редактировать')
@@ -0,0 +1,51 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import counters
+from posts.models import Comment, Follow, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.reader = User.objects.create_user(username='Reader')
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении постов и подписок."""
+        counters.for_user(self.author)
+        counters.for_user(self.reader)
+        post = Post.objects.create(text='текст', author=self.author)
+        Post.objects.create(text='ещё текст', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='коммент')
+
+        stats = counters.for_user(self.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(counters.for_user(self.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        follow.delete()
+        post.delete()
+        stats = counters.for_user(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        """reconcile_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(text='текст', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='коммент')
+        UserStats.objects.update_or_create(
+            user=self.author, defaults={'posts_count': 42})
+        Post.objects.filter(pk=post.pk).update(comments_count=7)
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        self.assertEqual(counters.for_user(self.author).posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+from collections import Counter
+
+from django.test import TestCase, override_settings
+
+from posts import dataset
+from posts.models import Comment, Follow, Group, Post, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DatasetTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def generate(self, seed=1, posts=600, comments=900):
+        dataset.DatasetGenerator(
+            users=200, posts=posts, comments=comments, groups=10,
+            follows_per_user=10, celebrities=3, image_share=0.2,
+            seed=seed, batch_size=128,
+        ).generate()
+
+    def test_sizes_and_skew(self):
+        """Объёмы как заказано, подписки и группы распределены неравно."""
+        self.generate()
+        self.assertEqual(User.objects.count(), 200)
+        self.assertEqual(Post.objects.count(), 600)
+        self.assertEqual(Comment.objects.count(), 900)
+        self.assertEqual(Group.objects.count(), 10)
+        followers = Counter(Follow.objects.values_list('author_id',
+                                                       flat=True))
+        top = followers.most_common(1)[0][1]
+        self.assertGreater(top, 10 * sum(followers.values()) / 200)
+        groups = Counter(Post.objects.exclude(group=None).values_list(
+            'group_id', flat=True))
+        counts = sorted(groups.values())
+        self.assertGreater(counts[-1], 3 * counts[0])
+        with_images = Post.objects.exclude(image='').count()
+        self.assertTrue(60 < with_images < 200)
+        self.assertLessEqual(
+            len(set(Post.objects.values_list('image', flat=True))), 21)
+
+    def test_same_seed_same_data(self):
+        """Один seed даёт те же тексты и связи."""
+        self.generate(seed=7, posts=50, comments=20)
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username')[:50])
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.generate(seed=7, posts=50, comments=20)
+        second = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username')[:50])
+        self.assertEqual(
+            [(text, name.rstrip('0123456789')) for text, name in first],
+            [(text, name.rstrip('0123456789')) for text, name in second])
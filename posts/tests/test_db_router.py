@@ -0,0 +1,51 @@
+from django.contrib.sessions.models import Session
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import db_router
+from core.middleware import ReplicaPinMiddleware
+from posts.models import Follow, Post, User, UserStats
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.seen = []
+
+        @db_router.replica_reads
+        def view(request):
+            self.seen.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        self.middleware = ReplicaPinMiddleware(view)
+        self.factory = RequestFactory()
+
+    def test_reads_go_to_replicas_and_writes_to_primary(self):
+        """Чтения лент расходятся по репликам, запись — в основную базу."""
+        with db_router.use_replicas():
+            reads = {router.db_for_read(Post) for _ in range(50)}
+            self.assertEqual(router.db_for_write(Post), 'default')
+            with db_router.use_primary():
+                self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(reads, set(REPLICAS))
+
+    def test_other_reads_stay_on_primary(self):
+        """Сессии, пользователи и чтения вне лент идут в основную базу."""
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with db_router.use_replicas():
+            for model in (Session, User, UserStats, Follow):
+                self.assertEqual(router.db_for_read(model), 'default')
+
+    def test_writer_is_pinned_to_primary(self):
+        """После записи посетитель какое-то время читает из основной."""
+        response = self.middleware(self.factory.post('/new/'))
+        cookie = response.cookies[ReplicaPinMiddleware.COOKIE]
+        self.middleware(self.factory.get('/', HTTP_COOKIE=cookie.output(
+            attrs=[], header='')))
+        self.middleware(self.factory.get('/'))
+        self.assertEqual(self.seen[:2], ['default', 'default'])
+        self.assertIn(self.seen[2], REPLICAS)
+        self.assertGreater(int(cookie['max-age']), 0)
@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from posts import follow_graph
+from posts.follow_graph import FollowGraph
+from posts.models import Follow, User
+
+
+class FollowGraphStructureTests(SimpleTestCase):
+    def test_sorted_adjacency(self):
+        """Списки смежности отсортированы и не содержат повторов."""
+        graph = FollowGraph()
+        for user_id, author_id in [(3, 9), (1, 9), (2, 9), (1, 9), (1, 4)]:
+            graph.add(user_id, author_id)
+        self.assertEqual(list(graph.followers[9]), [1, 2, 3])
+        self.assertEqual(list(graph.following[1]), [4, 9])
+        self.assertTrue(graph.is_following(2, 9))
+        self.assertFalse(graph.is_following(9, 2))
+        graph.remove(2, 9)
+        graph.remove(2, 9)
+        self.assertEqual(list(graph.followers[9]), [1, 3])
+        self.assertNotIn(2, graph.following)
+        self.assertEqual(graph.edges(), 3)
+
+
+@override_settings(FOLLOW_GRAPH_SYNC_INTERVAL=0)
+class FollowGraphTests(TransactionTestCase):
+    def setUp(self):
+        follow_graph.reset()
+        self.reader = User.objects.create_user(username='Agafon')
+        self.author = User.objects.create_user(username='Fekla')
+        self.other = User.objects.create_user(username='Kapiton')
+        Follow.objects.create(user=self.other, author=self.author)
+
+    def test_answers_without_queries(self):
+        """После загрузки граф отвечает без запросов к базе."""
+        self.assertEqual(follow_graph.followers(self.author.id),
+                         [self.other.id])
+        self.client.force_login(self.reader)
+        self.client.get(f'/{self.author.username}/follow/')
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.is_following(self.reader.id,
+                                                      self.author.id))
+            self.assertEqual(follow_graph.followers_count(self.author.id), 2)
+            self.assertEqual(follow_graph.following(self.reader.id),
+                             [self.author.id])
+        response = self.client.get(f'/{self.author.username}/')
+        self.assertTrue(response.context['following'])
+        self.client.get(f'/{self.author.username}/unfollow/')
+        self.assertFalse(follow_graph.is_following(self.reader.id,
+                                                   self.author.id))
+
+    def test_replays_log_of_other_processes(self):
+        """Операции других процессов берутся из журнала, без перезагрузки."""
+        follow_graph.following_count(self.reader.id)
+        # подписку записал другой процесс: строка в базе и операция в журнале
+        Follow.objects.bulk_create([Follow(user=self.reader,
+                                           author=self.author)])
+        number = cache.incr(follow_graph.SEQ_KEY)
+        cache.set(f'follow-graph:op:{number}',
+                  ('add', self.reader.id, self.author.id))
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.is_following(self.reader.id,
+                                                      self.author.id))
+
+    def test_reloads_when_log_is_lost(self):
+        """Без журнала граф загружается из базы заново."""
+        follow_graph.following_count(self.reader.id)
+        Follow.objects.bulk_create([Follow(user=self.reader,
+                                           author=self.author)])
+        cache.clear()
+        self.assertTrue(follow_graph.is_following(self.reader.id,
+                                                  self.author.id))
+
+    def test_transaction_reads_graph_until_it_changes_follows(self):
+        """Транзакция читает граф, пока сама не изменила подписки."""
+        follow_graph.following_count(self.reader.id)
+        with transaction.atomic():
+            with self.assertNumQueries(0):
+                self.assertEqual(follow_graph.followers(self.author.id),
+                                 [self.other.id])
+            Follow.objects.create(user=self.reader, author=self.author)
+            # граф узнает о подписке только после коммита
+            self.assertEqual(follow_graph.followers(self.author.id),
+                             [self.reader.id, self.other.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(follow_graph.followers_count(self.author.id), 2)
+
+
+@override_settings(WEB_PROCESSES=2)
+class LocalCacheFollowGraphTests(TransactionTestCase):
+    def test_reads_database_without_shared_cache(self):
+        """LocMem у нескольких процессов: граф не строится, ответы из базы."""
+        reader = User.objects.create_user(username='Agafon')
+        author = User.objects.create_user(username='Fekla')
+        Follow.objects.create(user=reader, author=author)
+        with self.assertNumQueries(1):
+            self.assertTrue(follow_graph.is_following(reader.id, author.id))
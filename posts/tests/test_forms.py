@@ -1,3 +1,5 @@
+from unittest import mock
+
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase
 from django.urls import reverse
@@ -79,3 +81,17 @@ class PostCreateFormTests(TestCase):
                 group=self.group.id,
             ).exists()
         )
+
+    def test_edit_post_is_atomic(self):
+        """Ошибка при индексации откатывает и саму правку поста."""
+        url = reverse('posts:post_edit', kwargs={'username': self.user,
+                                                 'post_id': self.post.id})
+        with mock.patch('posts.search.index_post',
+                        side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.authorized_client.post(url, data={
+                'group': self.group.id,
+                'text': 'Правка, которая не сохранится',
+            })
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'test text')
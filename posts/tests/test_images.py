@@ -0,0 +1,73 @@
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images, thumbnails
+from posts.models import Post, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+ORIENTATION = 0x0112
+
+
+def make_photo(size=(300, 100), orientation=6):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    Image.new('RGB', size, 'blue').save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE_WORKERS=0,
+                   IMAGE_MAX_SIZE=(60, 60))
+class ImagePipelineTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Gleb')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_process_fixes_orientation_and_strips_exif(self):
+        """Картинка повёрнута по EXIF, уменьшена и без метаданных."""
+        source = tempfile.NamedTemporaryFile(suffix='.jpg')
+        source.write(make_photo())
+        source.flush()
+        data = images.process(source.name, (60, 60), 'JPEG', 85)
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual(image.size, (20, 60))
+            self.assertNotIn(ORIENTATION, image.getexif())
+
+    def test_upload_is_replaced_after_commit(self):
+        """Загруженный файл заменяется обработанным, превью готово."""
+        photo = make_photo()
+        digest = hashlib.sha256(photo).hexdigest()
+        upload = SimpleUploadedFile('photo.jpg', photo,
+                                    content_type='image/jpeg')
+        self.client.post(reverse('posts:new_post'),
+                         {'text': 'Фото', 'image': upload})
+        post = Post.objects.get(text='Фото')
+        raw_name = f'posts/{digest[:2]}/{digest}.jpg'
+        self.assertNotEqual(post.image.name, raw_name)
+        self.assertFalse(post.image.storage.exists(raw_name))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (20, 60))
+        self.assertIsNotNone(thumbnails.url(post, 'card'))
+
+    def test_broken_upload_keeps_original(self):
+        """Если обработать файл не удалось, пост остаётся с исходником."""
+        post = Post.objects.create(text='Фото', author=self.user)
+        post.image = SimpleUploadedFile('bad.jpg', b'not an image')
+        post.save()
+        raw_name = post.image.name
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, raw_name)
+        self.assertTrue(post.image.storage.exists(raw_name))
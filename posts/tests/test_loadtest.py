@@ -0,0 +1,27 @@
+from django.test import TransactionTestCase
+
+from posts import dataset, loadtest
+
+
+class LoadTestHarnessTests(TransactionTestCase):
+    def test_run_reports_every_view(self):
+        """Прогон собирает задержки и запросы по каждому сценарию."""
+        dataset.DatasetGenerator(users=5, posts=30, comments=30, groups=2,
+                                 follows_per_user=2).generate()
+        dataset.rebuild_derived()
+        result = loadtest.run(requests=60, threads=1, warmup=0)
+        self.assertEqual(result['requests'], 60)
+        for name, view in result['views'].items():
+            with self.subTest(view=name):
+                self.assertEqual(view['errors'], 0)
+                self.assertLessEqual(view['p50_ms'], view['p99_ms'])
+        self.assertGreater(result['views']['follow_index']['queries'], 0)
+        lines = loadtest.compare(result, result)
+        self.assertIn('(+0%)', lines[0])
+
+    def test_percentile(self):
+        """Процентиль берётся по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 0.5), 50)
+        self.assertEqual(loadtest.percentile(values, 0.99), 99)
+        self.assertIsNone(loadtest.percentile([], 0.5))
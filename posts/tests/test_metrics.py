@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        Post.objects.create(text='Текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_views_sql_templates_and_cache_are_counted(self):
+        """Запрос к ленте попадает во все метрики."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.client.get(
+            reverse('metrics'),
+            HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('yatube_requests_total{method="GET",status="200",'
+                      'view="posts:index"} 2', text)
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="posts:index"} 2', text)
+        self.assertIn('yatube_request_duration_seconds_bucket'
+                      '{view="posts:index",le="+Inf"} 2', text)
+        self.assertIn('yatube_template_render_seconds_count'
+                      '{template="index.html"} 1', text)
+        self.assertIn('yatube_cache_requests_total{kind="page",'
+                      'result="hit"} 1', text)
+        self.assertRegex(text, r'yatube_db_queries_total\{view="posts:index"\}'
+                               r' [1-9]')
+
+    def test_endpoint_needs_token(self):
+        """Без токена метрики не видны, в том числе с локального адреса."""
+        client = Client(REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(client.get(reverse('metrics')).status_code, 404)
+        self.assertEqual(client.get(
+            reverse('metrics'),
+            HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(client.get(
+                reverse('metrics'),
+                HTTP_AUTHORIZATION='Bearer ').status_code, 404)
@@ -0,0 +1,58 @@
+import datetime as dt
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class NdjsonTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Lev')
+        self.reader = User.objects.create_user(username='Olga')
+        self.group = Group.objects.create(title='Книги', slug='books')
+        self.old_date = timezone.make_aware(dt.datetime(1854, 3, 14))
+        post = Post.objects.create(text='Дневник', author=self.author,
+                                   group=self.group)
+        Post.objects.filter(pk=post.pk).update(pub_date=self.old_date)
+        Comment.objects.create(post=post, author=self.reader, text='Ого')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_export_and_import_round_trip(self):
+        """Выгрузка и загрузка сохраняют данные, связи и даты."""
+        dump = tempfile.NamedTemporaryFile(suffix='.ndjson.gz')
+        call_command('export_ndjson', dump.name, stdout=StringIO())
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        Group.objects.all().delete()
+        call_command('import_ndjson', dump.name, batch_size=1,
+                     stdout=StringIO())
+
+        post = Post.objects.get()
+        self.assertEqual(post.pub_date, self.old_date)
+        self.assertEqual(post.author, self.author)
+        self.assertEqual(post.group.slug, 'books')
+        self.assertEqual(post.comments_count, 1)
+        comment = Comment.objects.get()
+        self.assertEqual((comment.post, comment.author),
+                         (post, self.reader))
+        self.assertTrue(Follow.objects.filter(user=self.reader,
+                                              author=self.author).exists())
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(TimelineEntry.objects.get(user=self.reader).post,
+                         post)
+
+    def test_comment_without_post(self):
+        """Комментарий без поста загружается без сдвига id."""
+        Comment.objects.create(post=None, author=self.reader, text='Ничей')
+        dump = tempfile.NamedTemporaryFile(suffix='.ndjson')
+        call_command('export_ndjson', dump.name, stdout=StringIO())
+        Comment.objects.all().delete()
+        call_command('import_ndjson', dump.name, skip_derived=True,
+                     stdout=StringIO())
+        self.assertIsNone(Comment.objects.get(text='Ничей').post)
+        self.assertEqual(Comment.objects.get(text='Ого').post.text,
+                         'Дневник')
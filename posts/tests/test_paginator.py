@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
 from posts.models import Post, Group, User
+from posts.paginator import page_window
 
 User = get_user_model()
 
@@ -23,6 +25,10 @@ class PaginatorViewsTest(TestCase):
                 group=cls.group,
                 author=cls.user,)
 
+    def setUp(self):
+        # страницы анонимам отдаются из кэша, а контекст нужен от рендера
+        cache.clear()
+
     def test_first_page_containse_ten_records(self):
         response = self.client.get(reverse('posts:index'))
         self.assertEqual(len(response.context.get('page').object_list), 10)
@@ -30,3 +36,44 @@ class PaginatorViewsTest(TestCase):
     def test_second_page_containse_three_records(self):
         response = self.client.get(reverse('posts:index') + '?page=2')
         self.assertEqual(len(response.context.get('page').object_list), 3)
+
+    def test_cursor_pages_walk_the_feed(self):
+        """Курсоры after/before листают ленту без номеров страниц."""
+        first = self.client.get(reverse('posts:index')).context['page']
+        next_cursor = first.paginator.next_cursor
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+
+        second = self.client.get(
+            reverse('posts:index') + f'?after={next_cursor}'
+        ).context['page']
+        self.assertEqual(len(second.object_list), 3)
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+        self.assertGreaterEqual(first[-1].pub_date, second[0].pub_date)
+
+        back = self.client.get(
+            reverse('posts:index')
+            + f'?before={second.paginator.previous_cursor}'
+        ).context['page']
+        self.assertEqual([post.id for post in back],
+                         [post.id for post in first])
+
+    def test_broken_cursor_shows_first_page(self):
+        """Битый курсор не ломает страницу."""
+        response = self.client.get(reverse('posts:index') + '?after=!!!')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page'].object_list), 10)
+
+    def test_numbered_pages_use_cached_count(self):
+        """?page=N берёт число постов из кэша и не пересчитывает его."""
+        cache.set('feed-count:index', 25)
+        response = self.client.get(reverse('posts:index') + '?page=1')
+        self.assertEqual(response.context['page'].paginator.num_pages, 3)
+        cache.delete('feed-count:index')
+
+    def test_page_window_is_elided(self):
+        """В навигации только окно страниц вокруг текущей."""
+        self.assertEqual(page_window(7, 100),
+                         [1, None, 5, 6, 7, 8, 9, None, 100])
+        self.assertEqual(page_window(2, 4), [1, 2, 3, 4])
@@ -0,0 +1,81 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\S+$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTests(TestCase):
+    """
+    Каждый SELECT, который выполняют страницы лент, проверяется через
+    EXPLAIN QUERY PLAN: без полного просмотра таблиц и без сортировки
+    во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(text=f'Текст {i}',
+                                           author=cls.author,
+                                           group=cls.group)
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text='Комментарий')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in self.plan(sql):
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertIsNone(FULL_SCAN.match(step))
+                    self.assertNotIn('TEMP B-TREE', step)
+
+    def test_feed_queries_use_indexes(self):
+        """Основные запросы лент идут по индексам."""
+        first = self.client.get(reverse('posts:index')).context['page']
+        cursor = f'?after={first.paginator.next_cursor}'
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + cursor,
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:group', kwargs={'slug': self.group.slug}) + cursor,
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:profile', kwargs={'username': self.author})
+            + cursor,
+            reverse('posts:follow_index'),
+            reverse('posts:post_view', kwargs={'username': self.author,
+                                               'post_id': self.post.id}),
+            reverse('api:index') + cursor,
+            reverse('api:follow_index'),
+            reverse('api:post_view', args=[self.post.id]),
+        ]
+        for url in urls:
+            self.assert_indexed(url)
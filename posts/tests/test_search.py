@@ -0,0 +1,57 @@
+from unittest import skipUnless
+
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+
+@skipUnless(connection.vendor == 'sqlite', 'поиск работает на SQLite FTS5')
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Anton')
+        cls.post = Post.objects.create(text='Ездили на рыбалку к озеру',
+                                       author=cls.user)
+        Post.objects.create(text='Пекли пироги', author=cls.user)
+
+    def found(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return [post.id for post in response.context['page']]
+
+    def test_search_finds_posts_by_words(self):
+        """Поиск находит посты по словам и их началу."""
+        self.assertEqual(self.found('рыбалк'), [self.post.id])
+        self.assertEqual(self.found('ОЗЕРУ'), [self.post.id])
+        self.assertEqual(self.found('"; DROP'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Ходили в горы'
+        post.save()
+        self.assertEqual(self.found('рыбалку'), [])
+        self.assertEqual(self.found('горы'), [self.post.pk])
+        post.delete()
+        self.assertEqual(self.found('горы'), [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через тот же индекс."""
+        admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+        queryset, _ = admin.get_search_results(
+            request, Post.objects.all(), 'пирог')
+        self.assertEqual(list(queryset.values_list('text', flat=True)),
+                         ['Пекли пироги'])
+
+    def test_rebuild(self):
+        """rebuild восстанавливает индекс по таблице постов."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(self.found('рыбалку'), [])
+        search.rebuild()
+        self.assertEqual(self.found('рыбалку'), [self.post.id])
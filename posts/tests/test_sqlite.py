@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from core.sqlite3.base import DatabaseWrapper
+
+
+class SqliteConnectionTests(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.db = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(self.workdir, 'db.sqlite3'),
+        }, alias='sqlite-test')
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.db.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied(self):
+        """Новое соединение получает прагмы из настроек."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        # 1 - NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+
+    def test_transactions_begin_immediate(self):
+        """Транзакция сразу берёт блокировку записи."""
+        executed = []
+
+        def remember(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with self.db.execute_wrapper(remember):
+            # так транзакцию начинает atomic()
+            self.db.set_autocommit(
+                False, force_begin_transaction_with_broken_autocommit=True)
+            try:
+                self.pragma('user_version')
+            finally:
+                self.db.rollback()
+                self.db.set_autocommit(True)
+        self.assertEqual(executed[0], 'BEGIN IMMEDIATE')
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from posts import storage
+from posts.models import Post, StoredImage, User
+from posts.storage import post_images
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Savva')
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковое содержимое сохраняется в один файл."""
+        first = post_images.save('posts/a.JPG', ContentFile(b'meme'))
+        second = post_images.save('posts/b.jpg', ContentFile(b'meme'))
+        other = post_images.save('posts/a.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('posts/') and first.endswith('.jpg'))
+        self.assertNotEqual(first, other)
+
+    def test_file_lives_while_posts_refer_to_it(self):
+        """Файл удаляется вместе с последним ссылающимся постом."""
+        name = post_images.save('posts/meme.png', ContentFile(b'meme'))
+        first = Post.objects.create(text='1', author=self.user, image=name)
+        second = Post.objects.create(text='2', author=self.user, image=name)
+        first.delete()
+        self.assertTrue(post_images.exists(name))
+        second.image = None
+        second.save()
+        self.assertFalse(post_images.exists(name))
+
+    def test_refs_follow_posts(self):
+        """Строка StoredImage считает посты, ссылающиеся на файл."""
+        name = post_images.save('posts/meme.png', ContentFile(b'meme'))
+        posts = [Post.objects.create(text=str(i), author=self.user,
+                                     image=name) for i in range(3)]
+        self.assertEqual(StoredImage.objects.get(name=name).refs, 3)
+        posts[0].delete()
+        self.assertEqual(StoredImage.objects.get(name=name).refs, 2)
+
+    def test_saving_same_file_keeps_it_alive(self):
+        """Файл, который как раз сохраняют заново, не удаляется."""
+        name = post_images.save('posts/meme.png', ContentFile(b'meme'))
+        post = Post.objects.create(text='1', author=self.user, image=name)
+        # вторая загрузка держит ссылку, пока пост её не заберёт
+        self.assertEqual(
+            post_images.save('posts/b.png', ContentFile(b'meme')), name)
+        post.delete()
+        self.assertTrue(post_images.exists(name))
+        Post.objects.create(text='2', author=self.user, image=name)
+        self.assertEqual(StoredImage.objects.get(name=name).refs, 1)
+
+    def test_recount_after_bulk_create(self):
+        """recount() учитывает посты, созданные без сигналов."""
+        name = post_images.save('posts/meme.png', ContentFile(b'meme'))
+        Post.objects.bulk_create([Post(text=str(i), author=self.user,
+                                       image=name) for i in range(2)])
+        self.assertEqual(storage.recount(), 1)
+        self.assertEqual(StoredImage.objects.get(name=name).refs, 2)
+
+    def test_dedupe_media_moves_old_files(self):
+        """Команда переносит старые файлы под имена по хешу."""
+        os.makedirs(post_images.path('posts'), exist_ok=True)
+        for name in ('posts/one.png', 'posts/two.png'):
+            with open(post_images.path(name), 'wb') as old_file:
+                old_file.write(b'meme')
+            Post.objects.create(text=name, author=self.user, image=name)
+        call_command('dedupe_media', stdout=StringIO())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertTrue(post_images.exists(names.pop()))
+        self.assertFalse(post_images.exists('posts/one.png'))
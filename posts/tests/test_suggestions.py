@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from posts import follow_graph, suggestions
+from posts.models import Follow, FollowSuggestion, Post, User
+
+
+@override_settings(FOLLOW_GRAPH_SYNC_INTERVAL=60)
+class SuggestionsTests(TransactionTestCase):
+    def setUp(self):
+        follow_graph.reset()
+        names = ['anna', 'boris', 'vera', 'gleb', 'darya', 'egor']
+        self.users = {name: User.objects.create_user(username=name)
+                      for name in names}
+        for user, author in [('anna', 'boris'), ('anna', 'egor'),
+                             ('boris', 'vera'), ('boris', 'gleb'),
+                             ('egor', 'gleb'), ('vera', 'gleb')]:
+            Follow.objects.create(user=self.users[user],
+                                  author=self.users[author])
+        Post.objects.create(text='Свежий пост', author=self.users['vera'])
+        call_command('compute_suggestions', workers=0, chunk_size=2,
+                     stdout=StringIO())
+
+    def suggested(self, name):
+        return [suggestion.author.username for suggestion in
+                FollowSuggestion.objects.filter(user=self.users[name])]
+
+    def test_friends_of_friends_by_weight(self):
+        """Общие подписки и активность поднимают автора выше."""
+        # gleb - через двух друзей, vera - через одного, но пишет посты
+        self.assertEqual(self.suggested('anna'), ['gleb', 'vera'])
+        self.assertNotIn('boris', self.suggested('anna'))
+
+    def test_popular_authors_for_newcomers(self):
+        """Без подписок рекомендуются популярные авторы."""
+        self.assertEqual(self.suggested('darya')[0], 'gleb')
+        self.assertLessEqual(len(self.suggested('darya')),
+                             settings.SUGGESTIONS_PER_USER)
+
+    def test_friend_of_friend_above_active_popular_author(self):
+        """Друг друга без постов выше популярного и активного автора."""
+        star = User.objects.create_user(username='zvezda')
+        for name in ('anna', 'vera', 'darya', 'egor'):
+            Follow.objects.create(user=self.users[name], author=star)
+        Post.objects.bulk_create(
+            [Post(text=str(i), author=star) for i in range(20)])
+        ivan = User.objects.create_user(username='ivan')
+        Follow.objects.create(user=ivan, author=self.users['boris'])
+        call_command('compute_suggestions', workers=0, stdout=StringIO())
+        self.assertEqual(
+            [suggestion.author.username for suggestion in
+             FollowSuggestion.objects.filter(user=ivan)][:3],
+            ['vera', 'gleb', 'zvezda'])
+
+    def test_shown_with_one_query(self):
+        """Рекомендации читаются одним запросом и без свежих подписок."""
+        anna = self.users['anna']
+        with self.assertNumQueries(1):
+            shown = suggestions.for_user(anna)
+        self.assertEqual([s.author.username for s in shown],
+                         ['gleb', 'vera'])
+        Follow.objects.create(user=anna, author=self.users['gleb'])
+        with self.assertNumQueries(1):
+            shown = suggestions.for_user(anna)
+        self.assertEqual([s.author.username for s in shown], ['vera'])
+        self.client.force_login(anna)
+        response = self.client.get('/follow/')
+        self.assertEqual([s.author.username for s in
+                          response.context['suggestions']], ['vera'])
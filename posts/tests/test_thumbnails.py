@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name='small.png', color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE_WORKERS=0)
+class ThumbnailTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Foma')
+
+    def test_thumbnail_is_made_on_save(self):
+        """Превью создаётся при сохранении и попадает в карточку."""
+        post = Post.objects.create(text='С картинкой', author=self.user,
+                                   image=make_image())
+        post.refresh_from_db()
+        card_url = thumbnails.url(post, 'card')
+        self.assertIsNotNone(card_url)
+        response = self.client.get(f'/{self.user.username}/')
+        self.assertContains(response, card_url)
+
+    def test_new_image_replaces_thumbnail(self):
+        """Смена картинки даёт новое превью, а без картинки его нет."""
+        post = Post.objects.create(text='С картинкой', author=self.user,
+                                   image=make_image())
+        post.refresh_from_db()
+        old_url = thumbnails.url(post, 'card')
+        post.image = make_image('other.png', 'green')
+        post.save()
+        post.refresh_from_db()
+        self.assertNotEqual(thumbnails.url(post, 'card'), old_url)
+        post.image = None
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnails, '')
+        self.assertIsNone(thumbnails.url(post, 'card'))
+
+    def test_missing_file_is_skipped(self):
+        """Пост с отсутствующим файлом сохраняется без превью."""
+        post = Post.objects.create(text='Без файла', author=self.user,
+                                   image='posts/missing.jpg')
+        post.refresh_from_db()
+        self.assertIsNone(thumbnails.url(post, 'card'))
+
+    def test_post_without_image_is_not_updated(self):
+        """Сохранение поста без картинки не пишет пустые превью."""
+        post = Post.objects.create(text='Без картинки', author=self.user)
+        with self.assertNumQueries(0):
+            thumbnails.generate(post)
+
+    def test_card_shows_original_until_thumbnail_is_ready(self):
+        """Пока превью нет, карточка показывает исходную картинку."""
+        post = Post.objects.create(text='С картинкой', author=self.user,
+                                   image=make_image())
+        Post.objects.filter(pk=post.pk).update(thumbnails='')
+        post.refresh_from_db()
+        response = self.client.get(f'/{self.user.username}/')
+        self.assertContains(response, f'src="{post.image.url}"')
@@ -0,0 +1,69 @@
+from django.test import TestCase, override_settings
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.other = User.objects.create_user(username='Other')
+
+    def entries(self):
+        return list(TimelineEntry.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает только в ленты подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='текст', author=self.author)
+        Post.objects.create(text='чужой', author=self.other)
+        self.assertEqual(self.entries(), [post.id])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка дозаполняет ленту, отписка очищает её."""
+        posts = [Post.objects.create(text=f'текст {i}', author=self.author)
+                 for i in range(3)]
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCountEqual(self.entries(), [post.id for post in posts])
+        follow.delete()
+        self.assertEqual(self.entries(), [])
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_timeline_is_capped(self):
+        """В ленте хранится не больше TIMELINE_MAX_LENGTH записей."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(4):
+            Post.objects.create(text=f'текст {i}', author=self.author)
+        self.assertEqual(len(self.entries()), 2)
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_trim_is_one_delete_for_many_timelines(self):
+        """Ленты всех подписчиков обрезаются одним запросом."""
+        for user in (self.reader, self.other):
+            Follow.objects.create(user=user, author=self.author)
+        posts = [Post.objects.create(text=f'текст {i}', author=self.author)
+                 for i in range(3)]
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user=user, post=post, author=self.author,
+                          pub_date=post.pub_date)
+            for user in (self.reader, self.other) for post in posts],
+            ignore_conflicts=True)
+        with self.assertNumQueries(1):
+            timeline.trim(self.reader.id, self.other.id)
+        for user in (self.reader, self.other):
+            self.assertEqual(
+                list(TimelineEntry.objects.filter(user=user).values_list(
+                    'post_id', flat=True)),
+                [posts[2].id, posts[1].id])
+
+    def test_rebuild_restores_timeline(self):
+        """rebuild восстанавливает ленты по таблице подписок."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='текст', author=self.author)
+        TimelineEntry.objects.all().delete()
+        timeline.rebuild()
+        self.assertEqual(self.entries(), [post.id])
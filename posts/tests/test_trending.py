@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts import trending
+from posts.models import Comment, Group, Post, TrendingScore, User
+
+HOUR = 60 * 60
+
+
+@override_settings(TRENDING_HALF_LIFE=HOUR, TRENDING_RENORMALIZE_EVERY=HOUR,
+                   TRENDING_WEIGHTS={'comment': 1.0, 'post': 0.5})
+class TrendingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Mefodiy')
+        self.group = Group.objects.create(title='Горячее', slug='hot')
+        self.quiet = Post.objects.create(text='Тихий пост',
+                                         author=self.user)
+        self.hot = Post.objects.create(text='Горячий пост',
+                                       author=self.user, group=self.group)
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.user, text='Да')
+
+    def test_comments_raise_posts_and_groups(self):
+        """Комментарии поднимают пост и его группу."""
+        self.comment(self.quiet)
+        self.comment(self.hot, 2)
+        ranking = trending.top('posts')
+        self.assertEqual([key for key, _ in ranking],
+                         [self.hot.id, self.quiet.id])
+        self.assertAlmostEqual(ranking[0][1], 2.5, places=2)
+        self.assertEqual(trending.top('groups')[0][0], self.group.id)
+        # та же картина собирается и заново из базы
+        call_command('rebuild_trending', stdout=StringIO())
+        self.assertEqual([key for key, _ in trending.top('posts')],
+                         [self.hot.id, self.quiet.id])
+
+    def test_old_events_decay_and_renormalize(self):
+        """Старый вес затухает, перенос отсчёта не меняет порядок."""
+        TrendingScore.objects.all().delete()
+        start = 1000 * HOUR
+        trending._add('posts', 1, 1.0, start)
+        trending._add('posts', 2, 0.3, start + 2 * HOUR)
+        # спустя два периода полураспада 1.0 весит 0.25 < 0.3
+        ranking = trending._top('posts', 10, start + 2 * HOUR)
+        self.assertEqual([key for key, _ in ranking], [2, 1])
+        self.assertAlmostEqual(ranking[1][1], 0.25)
+        # следующее событие переносит строку на новую точку отсчёта
+        trending._add('posts', 1, 0.1, start + 2 * HOUR)
+        row = TrendingScore.objects.get(kind='posts', object_id=1)
+        self.assertEqual(row.epoch, start + 2 * HOUR)
+        self.assertAlmostEqual(row.score, 0.35)
+
+    def test_every_event_counts(self):
+        """Каждое событие добавляется к строке, ни одно не теряется."""
+        for _ in range(50):
+            trending._add('posts', 1, 1.0, 1000 * HOUR)
+        self.assertAlmostEqual(
+            TrendingScore.objects.get(kind='posts', object_id=1).score, 50)
+
+    def test_stale_rows_are_hidden_and_pruned(self):
+        """Строки за горизонтом не показываются и удаляются."""
+        TrendingScore.objects.all().delete()
+        start = 1000 * HOUR
+        trending._add('posts', 1, 1000.0, start)
+        trending._add('posts', 2, 1.0, start + 9 * HOUR)
+        self.assertEqual(
+            [key for key, _ in trending._top('posts', 10, start + 9 * HOUR)],
+            [2])
+        self.assertEqual(trending.prune(start + 9 * HOUR), 1)
+        self.assertFalse(TrendingScore.objects.filter(object_id=1).exists())
+
+    def test_page_is_cached(self):
+        """Пока рейтинг прежний, страница не обращается к базе."""
+        self.comment(self.hot)
+        url = reverse('posts:trending')
+        response = self.client.get(url)
+        self.assertContains(response, 'Горячий пост')
+        self.assertContains(response, '#Горячее')
+        with self.assertNumQueries(0):
+            self.client.get(url)
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts import updates
+from posts.models import Follow, Group, Post, User
+
+
+class FakeClock:
+    """Часы для updates.wait: sleep сдвигает время и вызывает on_sleep."""
+
+    def __init__(self, on_sleep=None):
+        self.now = 0.0
+        self.on_sleep = on_sleep
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        if self.on_sleep:
+            self.on_sleep(self.now)
+
+
+@override_settings(UPDATES_POLL_INTERVAL=0.5)
+class FeedUpdatesTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Prokhor')
+        self.reader = User.objects.create_user(username='Zosima')
+        self.group = Group.objects.create(title='Новости', slug='news')
+        self.old = Post.objects.create(text='Старый', author=self.author)
+        self.url = reverse('posts:feed_updates')
+
+    def poll(self, **params):
+        return self.client.get(self.url, params).json()
+
+    def test_waiting_checks_only_the_mark(self):
+        """Пока новых постов нет, запрос ждёт, не опрашивая базу."""
+        clock = FakeClock()
+        with self.assertNumQueries(0):
+            posts = updates.wait('index', self.old.id, 3,
+                                 clock=clock, sleep=clock.sleep)
+        self.assertEqual(clock.now, 3)
+        self.assertFalse(posts.exists())
+        self.assertEqual(self.poll(since=self.old.id, wait=0),
+                         {'count': 0, 'newest': self.old.id})
+
+    def test_returns_when_mark_moves(self):
+        """Ожидание заканчивается, как только отметка обгоняет клиента."""
+        post = Post.objects.create(text='Новый', author=self.author,
+                                   group=self.group)
+        # отметку будто вытеснили, а через секунду поставили снова
+        cache.delete('feed-mark:index')
+        clock = FakeClock(lambda now: now >= 1 and cache.set(
+            'feed-mark:index', post.id))
+        posts = updates.wait('index', self.old.id, 10,
+                             clock=clock, sleep=clock.sleep)
+        self.assertEqual(clock.now, 1)
+        self.assertEqual(list(posts), [post])
+        data = self.poll(since=self.old.id, wait=5, cards=1)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['newest'], post.id)
+        self.assertIn('Новый', data['html'])
+        data = self.poll(feed='group', group='news', since=0, wait=0)
+        self.assertEqual(data['count'], 1)
+
+    def test_request_blocks_until_mark_moves(self):
+        """С настройками по умолчанию запрос ждёт отметку, а не отвечает."""
+        post = Post.objects.create(text='Новый', author=self.author)
+        cache.delete('feed-mark:index')
+        clock = FakeClock(lambda now: now >= 4 and cache.set(
+            'feed-mark:index', post.id))
+        with mock.patch.object(updates, 'time', SimpleNamespace(
+                monotonic=clock, sleep=clock.sleep)):
+            data = self.poll(since=self.old.id, wait=10)
+        self.assertEqual(clock.now, 4)
+        self.assertEqual(data, {'count': 1, 'newest': post.id})
+
+    def test_rejects_non_finite_wait(self):
+        """?wait=nan или inf отклоняется, а не ждёт без предела."""
+        for value in ('nan', 'inf', '-inf'):
+            response = self.client.get(self.url, {'wait': value})
+            self.assertEqual(response.status_code, 400)
+
+    def test_follow_feed(self):
+        """Лента подписок видит посты авторов, на которых подписан."""
+        self.assertEqual(self.client.get(
+            self.url, {'feed': 'follow'}).status_code, 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Для подписчиков', author=self.author)
+        self.assertEqual(cache.get(f'feed-mark:follow:{self.reader.id}'),
+                         post.id)
+        self.client.force_login(self.reader)
+        data = self.poll(feed='follow', since=self.old.id, wait=1)
+        self.assertEqual(data, {'count': 1, 'newest': post.id})
+
+
+@override_settings(WEB_PROCESSES=2)
+class LocalCacheFeedUpdatesTests(TransactionTestCase):
+    def test_answers_at_once_without_shared_cache(self):
+        """Без общего кэша ждать нечего: ответ сразу из базы."""
+        author = User.objects.create_user(username='Prokhor')
+        old = Post.objects.create(text='Старый', author=author)
+        clock = FakeClock(lambda now: self.fail('ожидание без общего кэша'))
+        posts = updates.wait('index', old.id, 10,
+                             clock=clock, sleep=clock.sleep)
+        self.assertFalse(posts.exists())
+        self.assertEqual(clock.now, 0)
@@ -1,9 +1,10 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import caches
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts import counters
 from posts.models import Post, Group, User, Comment, Follow
 
 User = get_user_model()
@@ -198,3 +199,75 @@ class PostsPagesTests(TestCase):
         count_comments_guest_add = Comment.objects.all().count()
         self.assertNotEqual(count_comments_first, count_comments_user_add)
         self.assertEqual(count_comments_user_add, count_comments_guest_add)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Anton')
+        cls.group = Group.objects.create(
+            title='Название Группы',
+            slug='test_slug',
+            description='Описание',
+        )
+        for i in range(10):
+            post = Post.objects.create(text=f'Текст {i}', group=cls.group,
+                                       author=cls.user)
+            Comment.objects.create(post=post, author=cls.user, text='ок')
+        counters.for_user(cls.user)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_feeds_do_not_query_per_post(self):
+        """Карточки ленты не делают отдельных запросов на каждый пост."""
+        urls = {
+            reverse('posts:index'): 1,
+            reverse('posts:group', kwargs={'slug': self.group.slug}): 2,
+            reverse('posts:profile', kwargs={'username': self.user}): 3,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                self.client.get(url)
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Anton')
+        cls.post = Post.objects.create(text='Текст', author=cls.user)
+        for i in range(5):
+            commenter = User.objects.create_user(username=f'reader{i}')
+            Comment.objects.create(post=cls.post, author=commenter,
+                                   text=f'Комментарий {i}')
+        counters.for_user(cls.user)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_post_view_shows_first_comments(self):
+        """Под постом первая порция комментариев и ссылка на остальные."""
+        response = self.client.get(reverse(
+            'posts:post_view', args=[self.user.username, self.post.id]))
+        comments = response.context['comments']
+        self.assertEqual([c.text for c in comments],
+                         ['Комментарий 4', 'Комментарий 3', 'Комментарий 2'])
+        self.assertIsNotNone(response.context['comments_cursor'])
+        self.assertContains(response, 'Показать ещё')
+
+    def test_comments_endpoint_continues_without_per_author_queries(self):
+        """Продолжение грузится по курсору, авторы приходят одним запросом."""
+        url = reverse('posts:post_comments',
+                      args=[self.user.username, self.post.id])
+        first = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(first['comments']), 3)
+        with self.assertNumQueries(2):
+            rest = self.client.get(first['next']).json()
+        self.assertEqual([c['author'] for c in rest['comments']],
+                         ['reader1', 'reader0'])
+        self.assertIsNone(rest['next'])
+        response = self.client.get(url, {'after': 'мусор'})
+        self.assertContains(response, 'Комментарий 4')
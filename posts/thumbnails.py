@@ -0,0 +1,72 @@
+"""
+Превью картинок постов, которые готовятся при сохранении, а не при показе.
+
+Для каждой геометрии из POST_THUMBNAILS превью создаётся через sorl один
+раз, а его адрес записывается в Post.thumbnails вместе с именем исходного
+файла. Ленты читают только эти адреса и не трогают картинки и kvstore.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from sorl.thumbnail import get_thumbnail
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def _load(raw):
+    try:
+        return json.loads(raw or '{}')
+    except ValueError:
+        return {}
+
+
+def _source_exists(post):
+    try:
+        return post.image.storage.exists(post.image.name)
+    except SuspiciousFileOperation:
+        return False
+
+
+def url(post, alias):
+    """Адрес готового превью или None, если его ещё нет."""
+    return stored_url(post.thumbnails, post.image.name, alias)
+
+
+def stored_url(raw, image_name, alias):
+    """То же по сырым значениям полей thumbnails и image."""
+    if not image_name:
+        return None
+    data = _load(raw)
+    if data.get('source') != image_name:
+        return None
+    return data.get(alias)
+
+
+def generate(post, force=False):
+    """Создаёт превью всех геометрий и сохраняет их адреса в посте."""
+    if not post.image and not post.thumbnails:
+        # у поста без картинки стирать нечего
+        return
+    if not post.image:
+        data = {}
+    elif not force and _load(post.thumbnails).get('source') == post.image.name:
+        return
+    elif not _source_exists(post):
+        logger.warning('Нет файла %s у поста %s', post.image.name, post.pk)
+        return
+    else:
+        data = {'source': post.image.name}
+        try:
+            for alias, (geometry, options) in settings.POST_THUMBNAILS.items():
+                data[alias] = get_thumbnail(post.image, geometry,
+                                            **options).url
+        except (IOError, OSError):
+            logger.exception('Не удалось сделать превью для поста %s',
+                             post.pk)
+            return
+    post.thumbnails = json.dumps(data) if data else ''
+    Post.objects.filter(pk=post.pk).update(thumbnails=post.thumbnails)
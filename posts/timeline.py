@@ -0,0 +1,113 @@
+"""
+Материализованная лента подписок (fan-out on write).
+
+Каждый новый пост раскладывается в ленты подписчиков автора, при подписке
+лента дозаполняется последними постами автора, при отписке — чистится.
+Длина ленты ограничена TIMELINE_MAX_LENGTH последними записями.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import IntegerField, Value
+
+from . import follow_graph
+from .models import Follow, Post, TimelineEntry
+
+# лент в одном DELETE: SQLite ограничивает число параметров запроса
+TRIM_BATCH_SIZE = 500
+
+
+def _entry(user_id, post):
+    return TimelineEntry(user_id=user_id,
+                         post_id=post.id,
+                         author_id=post.author_id,
+                         pub_date=post.pub_date)
+
+
+def trim(*user_ids):
+    """
+    Оставляет в лентах пользователей только TIMELINE_MAX_LENGTH последних
+    записей: один DELETE с ROW_NUMBER() на пачку лент, а не на каждую.
+    """
+    table = TimelineEntry._meta.db_table
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), TRIM_BATCH_SIZE):
+            batch = user_ids[start:start + TRIM_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            # лишний уровень подзапроса нужен MySQL: там нельзя удалять из
+            # таблицы, читая её же в подзапросе напрямую
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN ('
+                f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                f'PARTITION BY user_id ORDER BY pub_date DESC, id DESC'
+                f') AS position FROM {table} '
+                f'WHERE user_id IN ({placeholders})) ranked '
+                f'WHERE position > %s)',
+                [*batch, settings.TIMELINE_MAX_LENGTH])
+
+
+def fan_out_post(post):
+    """
+    Добавляет новый пост в ленты всех подписчиков автора и возвращает их
+    id.
+    """
+    followers = follow_graph.followers(post.author_id)
+    if not followers:
+        return followers
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for user_id in followers],
+        ignore_conflicts=True,
+    )
+    trim(*followers)
+    return followers
+
+
+def add_author(user_id, author_id):
+    """Дозаполняет ленту пользователя постами автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).only(
+        'id', 'author_id', 'pub_date')[:settings.TIMELINE_MAX_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for post in posts],
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты пользователя посты автора после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 author_id=author_id).delete()
+
+
+def fill(user_id):
+    """
+    Собирает пустую ленту пользователя одним INSERT ... SELECT по всем его
+    подпискам, не создавая объектов моделей.
+    """
+    posts = Post.objects.filter(author__following__user_id=user_id).annotate(
+        timeline_user=Value(user_id, IntegerField()),
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'author_id', 'pub_date', 'timeline_user',
+    )[:settings.TIMELINE_MAX_LENGTH]
+    select, params = posts.query.sql_with_params()
+    table = TimelineEntry._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {table} '
+                       f'(post_id, author_id, pub_date, user_id) {select}',
+                       params)
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты с нуля по таблице подписок."""
+    follows = Follow.objects.all()
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    followers = list(follows.order_by('user_id').values_list(
+        'user_id', flat=True).distinct())
+    # каждая лента берёт сразу свои TIMELINE_MAX_LENGTH постов, а не
+    # по столько же от каждого автора с последующей обрезкой
+    with transaction.atomic():
+        entries.delete()
+        for user_id in followers:
+            fill(user_id)
@@ -0,0 +1,147 @@
+"""
+Популярные посты и группы с затухающим весом.
+
+Каждое событие (комментарий, новый пост) добавляет посту и его группе вес,
+который убывает вдвое за TRENDING_HALF_LIFE. Чтобы не пересчитывать старые
+веса, хранится вес, приведённый к моменту epoch: событие в момент t
+добавляет w * 2^((t - epoch) / half_life), и порядок по таким весам тот же,
+что по затухшим. Точка отсчёта - начало текущего периода длиной
+TRENDING_RENORMALIZE_EVERY, её все процессы вычисляют по часам одинаково.
+
+Веса лежат в таблице TrendingScore, строка на пост или группу. Событие -
+одно UPDATE с F() в транзакции, которая его вызвала, так что события не
+теряются и не мешают друг другу. Строка, приведённая к прошлому периоду,
+переносится на текущий тем же UPDATE. Строки старше HORIZON периодов
+полураспада в рейтинг не попадают, а prune() их удаляет.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Power
+
+from .models import TrendingScore
+
+KINDS = (TrendingScore.POSTS, TrendingScore.GROUPS)
+# через восемь периодов полураспада от веса остаётся 1/256
+HORIZON = 8
+
+
+def _top_key(kind, count):
+    return f'trending:top:{kind}:{count}'
+
+
+def _factor(seconds):
+    return 2 ** (seconds / settings.TRENDING_HALF_LIFE)
+
+
+def _epoch(now):
+    every = settings.TRENDING_RENORMALIZE_EVERY
+    return now // every * every
+
+
+def _add(kind, object_id, weight, now):
+    epoch = _epoch(now)
+    value = weight * _factor(now - epoch)
+    rows = TrendingScore.objects.filter(kind=kind, object_id=object_id)
+    if rows.filter(epoch=epoch).update(score=F('score') + value):
+        return
+    # вес прошлого периода затухает до новой точки отсчёта
+    decay = Power(2, (epoch - F('epoch')) / settings.TRENDING_HALF_LIFE)
+    if rows.filter(epoch__lt=epoch).update(
+            score=F('score') / decay + value, epoch=epoch):
+        return
+    try:
+        with transaction.atomic():
+            TrendingScore.objects.create(kind=kind, object_id=object_id,
+                                         score=value, epoch=epoch)
+    except IntegrityError:
+        # строку успело создать параллельное событие
+        _add(kind, object_id, weight, now)
+
+
+def record(post, weight):
+    """Добавляет вес посту и его группе в текущей транзакции."""
+    now = time.time()
+    _add(TrendingScore.POSTS, post.id, weight, now)
+    if post.group_id:
+        _add(TrendingScore.GROUPS, post.group_id, weight, now)
+
+
+def _top(kind, count, now):
+    epoch = _epoch(now)
+    decay = Power(2, (epoch - F('epoch')) / settings.TRENDING_HALF_LIFE)
+    rows = TrendingScore.objects.filter(
+        kind=kind,
+        epoch__gte=epoch - HORIZON * settings.TRENDING_HALF_LIFE,
+    ).annotate(current=F('score') / decay).order_by(
+        '-current', 'object_id').values_list('object_id', 'current')[:count]
+    scale = _factor(now - epoch)
+    return [(object_id, score / scale) for object_id, score in rows]
+
+
+def top(kind, count=None):
+    """
+    [(id, вес сейчас)] по убыванию веса. Рейтинг запрашивается из базы не
+    чаще раза в TRENDING_CACHE_TIMEOUT.
+    """
+    count = count or settings.TRENDING_SIZE
+    key = _top_key(kind, count)
+    ranking = cache.get(key)
+    if ranking is None:
+        ranking = _top(kind, count, time.time())
+        cache.set(key, ranking, settings.TRENDING_CACHE_TIMEOUT)
+    return ranking
+
+
+def prune(now=None):
+    """Удаляет строки, которые уже не попадут в рейтинг."""
+    epoch = _epoch(time.time() if now is None else now)
+    deleted, _ = TrendingScore.objects.filter(
+        epoch__lt=epoch - HORIZON * settings.TRENDING_HALF_LIFE).delete()
+    return deleted
+
+
+def rebuild(hours=None):
+    """
+    Собирает рейтинг заново по комментариям и постам за последние hours
+    часов (по умолчанию HORIZON периодов полураспада), например после
+    загрузки данных через bulk_create.
+    """
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from .models import Comment, Post
+    now = timezone.now()
+    epoch = _epoch(now.timestamp())
+    since = now - timedelta(
+        hours=hours or HORIZON * settings.TRENDING_HALF_LIFE / 3600)
+    weights = settings.TRENDING_WEIGHTS
+    sources = [
+        (weights['comment'], Comment.objects.filter(
+            created__gte=since, post__isnull=False).values_list(
+            'created', 'post_id', 'post__group_id')),
+        (weights['post'], Post.objects.filter(
+            pub_date__gte=since).values_list('pub_date', 'id', 'group_id')),
+    ]
+    scores = {kind: {} for kind in KINDS}
+    for weight, rows in sources:
+        for created, post_id, group_id in rows.iterator():
+            value = weight * _factor(created.timestamp() - epoch)
+            posts = scores[TrendingScore.POSTS]
+            posts[post_id] = posts.get(post_id, 0) + value
+            if group_id:
+                groups = scores[TrendingScore.GROUPS]
+                groups[group_id] = groups.get(group_id, 0) + value
+    with transaction.atomic():
+        TrendingScore.objects.all().delete()
+        TrendingScore.objects.bulk_create(
+            [TrendingScore(kind=kind, object_id=object_id, score=score,
+                           epoch=epoch)
+             for kind in KINDS for object_id, score in scores[kind].items()],
+            batch_size=1000)
+    cache.delete_many([_top_key(kind, settings.TRENDING_SIZE)
+                       for kind in KINDS])
@@ -0,0 +1,75 @@
+"""
+Отметки о новых постах для долгого опроса лент.
+
+У каждой ленты (общая, группа, подписки пользователя) в кэше хранится id
+самого нового поста. Отметки ставятся после коммита поста, поэтому по
+отметке в базе пост уже виден. Ожидающий запрос смотрит только на отметку
+и идёт в базу, лишь когда она обогнала то, что видел клиент.
+
+Отметки других процессов видны только через общий кэш. LocMem годится, пока
+сайт обслуживает один процесс (WEB_PROCESSES); иначе без общего кэша ждать
+нечего: ответ сразу берётся из базы, а клиент сам выдерживает паузу перед
+следующим опросом.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import is_shared
+
+from .models import Post, TimelineEntry
+
+
+def _mark_key(feed):
+    return f'feed-mark:{feed}'
+
+
+def publish(post, follower_ids=()):
+    """Поднимает отметки лент, в которые попал новый пост."""
+    feeds = ['index', *(f'follow:{user_id}' for user_id in follower_ids)]
+    if post.group_id:
+        feeds.append(f'group:{post.group_id}')
+    marks = {_mark_key(feed): post.id for feed in feeds}
+    transaction.on_commit(
+        lambda: cache.set_many(marks, settings.UPDATES_MARK_TIMEOUT))
+
+
+def newer_posts(feed, since):
+    """Посты ленты новее since, самые новые первыми."""
+    kind, _, value = feed.partition(':')
+    if kind == 'follow':
+        return Post.objects.feed().filter(
+            id__in=TimelineEntry.objects.filter(
+                user_id=value, post_id__gt=since).values('post_id'))
+    posts = Post.objects.feed().filter(id__gt=since)
+    if kind == 'group':
+        posts = posts.filter(group_id=value)
+    return posts
+
+
+def wait(feed, since, timeout, clock=None, sleep=None):
+    """
+    Ждёт до timeout секунд поста новее since и возвращает запрос с новыми
+    постами ленты. Пока отметка не сдвинулась, база не опрашивается.
+    """
+    if not is_shared():
+        return newer_posts(feed, since)
+    clock = clock or time.monotonic
+    sleep = sleep or time.sleep
+    deadline = clock() + timeout
+    seen = since
+    while True:
+        mark = cache.get(_mark_key(feed), 0)
+        if mark > seen:
+            posts = newer_posts(feed, since)
+            if posts.exists():
+                return posts
+            # самый новый пост успели удалить: ждём следующего
+            seen = mark
+        left = deadline - clock()
+        if left <= 0:
+            # отметку могли вытеснить из кэша: последний раз спросим базу
+            return newer_posts(feed, since)
+        sleep(min(settings.UPDATES_POLL_INTERVAL, left))
@@ -1,64 +1,113 @@
+import hashlib
+import math
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core.db_router import replica_reads
 
-from yatube.settings import COUNT_POSTS_IN_PAGE
+from . import (cards, counters, feed_cache, follow_graph, suggestions,
+               trending, updates)
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Comment, Follow
+from .models import Post, Group, User, Comment, Follow, TimelineEntry
+from .page_cache import cache_anonymous_page
+from .paginator import CachedCountPaginator, keyset_chunk, paginate
+from .search import SearchResults
 
 
+@cache_anonymous_page(lambda: ['index'])
+@replica_reads
 def index(request):
-    post_list = Post.objects.all()  # noqa
-    paginator = Paginator(post_list, COUNT_POSTS_IN_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'index.html', {'page': page})
+    post_list = Post.objects.feed()  # noqa
+    page = paginate(request, post_list, count_key='feed-count:index')
+    return render(request, 'index.html', {'page': page,
+                                          **feed_cache.context('index')})
 
 
+@cache_anonymous_page(lambda slug: [f'group:{slug}'])
+@replica_reads
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, COUNT_POSTS_IN_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = group.posts.feed()
+    page = paginate(request, posts, count_key=f'feed-count:group:{group.id}')
     return render(request, 'group.html', {'page': page,
                                           'group': group})
 
 
+@cache_anonymous_page(lambda username: [f'author:{username}'])
+@replica_reads
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author__username=username)  # noqa
-    posts_amount = post_list.count()
-    paginator = Paginator(post_list, COUNT_POSTS_IN_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    # подписано на user'a
-    author_follows = Follow.objects.filter(author=author).count()
-    # user подписан на
-    user_follows = Follow.objects.filter(user=author).count()
+    post_list = Post.objects.feed().filter(author=author)  # noqa
+    stats = counters.for_user(author)
+    page = paginate(request, post_list, count=stats.posts_count)
     no_author = True
     if request.user == author:
         no_author = False
     following = False
     if request.user.is_authenticated:
-        if Follow.objects.filter(user=request.user, author=author).exists():
-            following = True
+        following = follow_graph.is_following(request.user.id, author.id)
     context = {'author': author,
                'page': page,
-               'paginator': paginator,
-               'posts_amount': posts_amount,
+               'paginator': page.paginator,
+               'posts_amount': stats.posts_count,
                'post_list': post_list,
-               'author_follows': author_follows,
-               'user_follows': user_follows,
+               # подписано на user'a
+               'author_follows': stats.followers_count,
+               # user подписан на
+               'user_follows': stats.following_count,
                'following': following,
                'no_author': no_author,
+               'suggestions': suggestions.for_user(request.user),
                }
     return render(request, 'profile.html', context)
 
 
+def _ranked(model, ranking, related=()):
+    """Объекты в порядке рейтинга; удалённые пропускаются."""
+    objects = model.objects.select_related(*related).in_bulk(
+        [key for key, _ in ranking])
+    return [objects[key] for key, _ in ranking if key in objects]
+
+
+def trending_index(request):
+    """
+    Популярные посты и группы. Рейтинг - одно чтение из кэша, а посты и
+    группы запрашиваются, только если фрагмент с таким рейтингом ещё не
+    отрисован.
+    """
+    posts = trending.top('posts')
+    groups = trending.top('groups')
+    ids = repr(([key for key, _ in posts], [key for key, _ in groups]))
+    return render(request, 'trending.html', {
+        # шаблон вызовет функции только при промахе кэша фрагмента
+        'top_posts': lambda: _ranked(Post, posts, ('author', 'group')),
+        'top_groups': lambda: _ranked(Group, groups),
+        'trending_key': hashlib.md5(ids.encode()).hexdigest(),
+        'trending_cache_timeout': settings.TRENDING_CACHE_TIMEOUT,
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = CachedCountPaginator(SearchResults(query),
+                                     settings.COUNT_POSTS_IN_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'search.html', {
+        'page': page,
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    })
+
+
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None,)
     if form.is_valid():
@@ -69,26 +118,61 @@ def new_post(request):
     return render(request, 'new_post.html', {'form': form})
 
 
+@cache_anonymous_page(
+    lambda username, post_id: [f'author:{username}', f'post:{post_id}'])
 def post_view(request, post_id, username):
-    post = get_object_or_404(Post, id=post_id)
-    posts_amount = Post.objects.filter(author=post.author).count()  # noqa
+    post = get_object_or_404(Post.objects.feed(), id=post_id)
+    stats = counters.for_user(post.author)
     form = CommentForm()
-    # подписано на user'a
-    author_follows = Follow.objects.filter(author=post.author).count()
-    # user подписан на
-    user_follows = Follow.objects.filter(user=post.author).count()
+    comments, cursor = comment_chunk(post)
     context = {'post': post,
                'author': post.author,
-               'posts_amount': posts_amount,
-               'comments': Comment.objects.filter(post=post),
+               'posts_amount': stats.posts_count,
+               'comments': comments,
+               'comments_cursor': cursor,
+               'comments_url': reverse('posts:post_comments',
+                                       args=[post.author.username, post.id]),
                'form': form,
-               'author_follows': author_follows,
-               'user_follows': user_follows,
+               # подписано на user'a
+               'author_follows': stats.followers_count,
+               # user подписан на
+               'user_follows': stats.following_count,
                }
     return render(request, 'post.html', context)
 
 
+def comment_chunk(post, after=None):
+    """Порция комментариев от новых к старым и курсор следующей порции."""
+    comments = Comment.objects.filter(post=post).select_related('author')
+    return keyset_chunk(comments, settings.COMMENTS_PER_PAGE,
+                        keys=('created', 'id'), after=after)
+
+
+@cache_anonymous_page(lambda username, post_id: [f'post:{post_id}'])
+def post_comments(request, username, post_id):
+    """Следующие комментарии поста: HTML-фрагмент или JSON (?format=json)."""
+    post = get_object_or_404(Post, id=post_id, author__username=username)
+    comments, cursor = comment_chunk(post, request.GET.get('after'))
+    comments_url = reverse('posts:post_comments', args=[username, post_id])
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [{'id': comment.id,
+                          'author': comment.author.username,
+                          'text': comment.text,
+                          'created': comment.created.isoformat()}
+                         for comment in comments],
+            'next': (f'{comments_url}?format=json&after={cursor}'
+                     if cursor else None),
+        })
+    return render(request, 'includes/comment_list.html', {
+        'comments': comments,
+        'comments_cursor': cursor,
+        'comments_url': comments_url,
+    })
+
+
 @login_required
+@transaction.atomic
 def post_edit(request, username, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
@@ -118,6 +202,7 @@ def server_error(request):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     user_post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None, instance=None)
@@ -134,25 +219,65 @@ def add_comment(request, username, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    user_follow_posts = Post.objects.filter(
-        author__following__user=request.user)
-    # подписано на user'a
-    author_follows = Follow.objects.filter(author=request.user).count()
-    # user подписан на
-    user_follows = Follow.objects.filter(user=request.user).count()
-    paginator = Paginator(user_follow_posts, COUNT_POSTS_IN_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    # лента подписок материализуется при публикации (posts.timeline)
+    entries = TimelineEntry.objects.filter(
+        user=request.user).select_related('post__author', 'post__group')
+    stats = counters.for_user(request.user)
+    page = paginate(request, entries,
+                    count_key=f'feed-count:follow:{request.user.id}')
+    page.object_list = [entry.post for entry in page.object_list]
     return render(request, "follow.html", {
-        'user_follows': user_follows,
-        'author_follows': author_follows,
+        # user подписан на
+        'user_follows': stats.following_count,
+        # подписано на user'a
+        'author_follows': stats.followers_count,
         'page': page,
+        'suggestions': suggestions.for_user(request.user),
+        **feed_cache.context('follow'),
     }
     )
 
 
+def feed_updates(request):
+    """
+    Долгий опрос ленты: ждёт до ?wait= секунд постов новее ?since= и
+    отдаёт их число, а с ?cards=1 ещё и карточки. Ленты: ?feed=index,
+    ?feed=group&group=<slug> и ?feed=follow.
+    """
+    try:
+        since = int(request.GET.get('since', 0))
+        timeout = float(request.GET.get('wait', settings.UPDATES_MAX_WAIT))
+    except ValueError:
+        return JsonResponse({'detail': 'Неверные параметры'}, status=400)
+    # nan и inf прошли бы через min/max, и запрос ждал бы без конца
+    if not math.isfinite(timeout):
+        return JsonResponse({'detail': 'Неверные параметры'}, status=400)
+    timeout = min(max(timeout, 0), settings.UPDATES_MAX_WAIT)
+    kind = request.GET.get('feed', 'index')
+    if kind == 'group':
+        group = get_object_or_404(Group, slug=request.GET.get('group'))
+        feed = f'group:{group.id}'
+    elif kind == 'follow':
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Нужно войти'}, status=401)
+        feed = f'follow:{request.user.id}'
+    elif kind == 'index':
+        feed = 'index'
+    else:
+        return JsonResponse({'detail': 'Неизвестная лента'}, status=400)
+    posts = updates.wait(feed, since, timeout)
+    newest = list(posts[:settings.COUNT_POSTS_IN_PAGE])
+    data = {'count': posts.count() if newest else 0,
+            'newest': max((post.id for post in newest), default=since)}
+    if request.GET.get('cards'):
+        data['html'] = cards.render(newest, request.user)
+    return JsonResponse(data)
+
+
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user.username != username:
@@ -161,6 +286,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
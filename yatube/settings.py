@@ -52,7 +52,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',  # метрики для Prometheus
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinMiddleware',  # чтение своих записей
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,7 +70,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки
+        'BACKEND': 'core.template_backend.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,11 +95,49 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 с прагмами для конкурентной записи (core.sqlite3)
+        'ENGINE': 'core.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # соединение живёт между запросами, прагмы не ставятся каждый раз
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Прагмы каждого нового соединения. WAL не блокирует читателей во время
+# записи; busy_timeout в мс; cache_size со знаком минус - в КиБ.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# транзакции сразу берут блокировку записи (см. core/sqlite3/base.py)
+SQLITE_BEGIN_IMMEDIATE = True
+
+# Реплики только для чтения (core.db_router): пути к файлам SQLite через
+# запятую. Локально их наполняет python manage.py sync_replicas.
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+        start=1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'core.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+# модели, которые view с core.db_router.replica_reads читают с реплик
+REPLICA_MODELS = ['posts.post', 'posts.group', 'posts.comment',
+                  'posts.timelineentry']
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# сколько секунд после записи посетитель читает из основной базы
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -145,6 +186,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# превью картинок постов: псевдоним -> (геометрия, опции sorl)
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# обработка загруженных картинок: процессы пула (0 - прямо в запросе),
+# наибольший размер, формат и качество
+IMAGE_PIPELINE_WORKERS = int(os.environ.get('YATUBE_IMAGE_WORKERS',
+                                            os.cpu_count() or 1))
+IMAGE_MAX_SIZE = (1920, 1920)
+IMAGE_FORMAT = 'JPEG'
+IMAGE_QUALITY = 85
+
 # Login
 
 LOGIN_URL = "/auth/login/"
@@ -154,13 +208,73 @@ LOGOUT_REDIRECT_URL = "posts:index"
 # количество постов на страницу
 COUNT_POSTS_IN_PAGE = 10
 
+# сколько комментариев показывать под постом за раз
+COMMENTS_PER_PAGE = 20
+
+# сколько последних постов хранится в материализованной ленте подписок
+TIMELINE_MAX_LENGTH = 1000
+
+# как долго (в секундах) кэшируется число постов в ленте для ?page=N
+FEED_COUNT_TIMEOUT = 60
+
+# время жизни фрагментов лент; свежесть обеспечивает номер поколения
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# карточки постов (posts.cards); ключ меняется вместе с постом
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# долгий опрос новых постов (posts.updates): предел ожидания и шаг проверки
+# отметки в секундах (ожидающий запрос занимает поток сервера); сколько живёт
+# отметка ленты
+UPDATES_MAX_WAIT = 10
+UPDATES_POLL_INTERVAL = 0.5
+UPDATES_MARK_TIMEOUT = 60 * 60 * 24
+
+# граф подписок в памяти (posts.follow_graph): как часто сверяться с
+# журналом операций других процессов и сколько живёт запись журнала
+FOLLOW_GRAPH_SYNC_INTERVAL = 1.0
+FOLLOW_GRAPH_LOG_TIMEOUT = 60 * 10
+
+# рекомендации подписок (posts.suggestions): сколько хранить и показывать,
+# за сколько дней учитывать активность автора и сколько процессов считают
+# пересчёт по умолчанию (0 - в процессе команды)
+SUGGESTIONS_PER_USER = 5
+SUGGESTIONS_ACTIVITY_DAYS = 30
+SUGGESTIONS_WORKERS = int(os.environ.get('YATUBE_SUGGESTIONS_WORKERS',
+                                         os.cpu_count() or 1))
+
+# популярное (posts.trending): период полураспада веса, как часто
+# переносить точку отсчёта (в секундах), сколько показывать, вес событий и
+# время жизни рейтинга и отрисованной страницы
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_RENORMALIZE_EVERY = 60 * 60
+TRENDING_SIZE = 20
+TRENDING_WEIGHTS = {'comment': 1.0, 'post': 0.5}
+TRENDING_CACHE_TIMEOUT = 60
+
+# кэш целых страниц для анонимных посетителей (posts.page_cache)
+PAGE_CACHE_TIMEOUT = 60 * 10
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # LocMemCache со счётчиками попаданий для метрик
+        'BACKEND': 'core.cache.InstrumentedLocMemCache',
     }
 }
+# сколько процессов обслуживают сайт. LocMem виден только своему процессу,
+# поэтому при нескольких процессах журнал графа подписок и отметки новых
+# постов требуют общего кэша (python-memcached, адреса через запятую)
+WEB_PROCESSES = int(os.environ.get('YATUBE_WEB_PROCESSES', 1))
+if os.environ.get('YATUBE_MEMCACHED'):
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.InstrumentedMemcachedCache',
+        'LOCATION': os.environ['YATUBE_MEMCACHED'].split(','),
+    }
 
 # Добавьте IP адреса при обращении с которых будет доступен debugToolbar
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
+
+# токен для /metrics/ (core.views.metrics_view); пустой - метрики выключены
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
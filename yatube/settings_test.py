@@ -0,0 +1,10 @@
+"""
+Настройки для тестов.
+
+База тестов SQLite живёт в памяти и не видна процессам пулов, поэтому
+картинки и рекомендации обрабатываются прямо в вызывающем потоке.
+"""
+from .settings import *  # noqa: F401,F403
+
+IMAGE_PIPELINE_WORKERS = 0
+SUGGESTIONS_WORKERS = 0